@@ -1,72 +1,535 @@
-import yfinance as yf
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+import numpy as np
 import pandas as pd   # ✅ ADD THIS
-import pandas_ta as ta
 from datetime import datetime
+from src.helpers import write_atomic
+from src.indicators_nb import ema_multi, ema_fft, rsi_wilder, atr_wilder
+from src.utils.http import SESSION
 
-def get_multi_timeframes(ticker, required_indicators=None):
+# Timeframes consumed by the strategies and the history window fetched for each
+TIMEFRAMES = {"1d": "1y", "1h": "60d", "5m": "7d"}
+
+# Yahoo accepts at most 20 symbols per request
+BATCH_SIZE = 20
+
+# Upper bound on concurrent batch jobs in fetch_all_timeframes (env YF_THREADS)
+MAX_WORKERS = int(os.getenv("YF_THREADS", 8))
+
+# Yahoo's spark endpoint returns close series for up to 20 comma-separated symbols
+SPARK_URL = "https://query1.finance.yahoo.com/v8/finance/spark"
+SPARK_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+# Live prices are reused for PRICE_TTL seconds: (symbol, period, interval) -> (fetched_at, price)
+PRICE_TTL = 60
+_PRICE_CACHE = {}
+_PRICE_LOCK = threading.Lock()
+
+REQUIRED_COLS = {"open", "high", "low", "close", "volume"}
+
+# All close-price EMAs are produced by one kernel pass; MACD uses ema12/ema26.
+# ema200 must stay last so the other spans form a contiguous block of rows.
+EMA_SPANS = (12, 20, 26, 50, 200)
+EMA_ALPHAS = 2.0 / (np.array(EMA_SPANS, dtype=np.float64) + 1.0)
+SIGNAL_ALPHA = np.array([2.0 / (9 + 1.0)])
+
+OHLCV_COLS = ["open", "high", "low", "close", "volume"]
+OHLC_COLS = OHLCV_COLS[:4]
+# rsi_gain/rsi_loss hold Wilder's running averages so RSI can resume incrementally
+INDICATOR_COLS = (
+    [f"ema{s}" for s in EMA_SPANS]
+    + ["macd", "signal", "hist", "rsi", "rsi_gain", "rsi_loss", "atr"]
+)
+
+# Indicator groups as bits: a run resolves its indicator names once and
+# add_indicators branches on integer ANDs instead of set lookups
+IND_EMA = {s: 1 << i for i, s in enumerate(EMA_SPANS)}
+IND_MACD = 1 << len(EMA_SPANS)   # macd, signal, hist
+IND_RSI = IND_MACD << 1          # rsi plus Wilder state
+IND_ATR = IND_RSI << 1
+IND_ALL = (IND_ATR << 1) - 1
+
+_COL_BITS = {
+    **{f"ema{s}": bit for s, bit in IND_EMA.items()},
+    "macd": IND_MACD, "signal": IND_MACD, "hist": IND_MACD,
+    "rsi": IND_RSI, "rsi_gain": IND_RSI, "rsi_loss": IND_RSI,
+    "atr": IND_ATR,
+}
+
+# Prepared frames (OHLCV + indicators) are cached per (ticker, interval) so reruns
+# only fetch the newest bars and only extend the indicators over them
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
+CACHE_MAX_AGE = 24 * 60 * 60  # seconds since the full fetch; older entries are refetched
+
+# In-process tier over the disk cache: long-lived processes (server, scheduler)
+# skip the unpickle on warm keys. Frames are stored and handed out as copies
+# because callers mutate them in place.
+MEM_CACHE_MAX = 512
+_MEM_CACHE = OrderedDict()
+_MEM_LOCK = threading.Lock()
+
+# yf.download collects results in a module-global dict, so overlapping calls
+# from different threads can clobber each other's frames
+_YF_LOCK = threading.Lock()
+
+
+def _download(tickers, interval, **kwargs):
+    """Serialized wrapper around yf.download (safe to call from worker threads)."""
+    import yfinance as yf
+
+    with _YF_LOCK:
+        return yf.download(
+            tickers=tickers,
+            interval=interval,
+            progress=False,
+            auto_adjust=False,
+            **kwargs
+        )
+
+
+def _cache_path(ticker, interval):
+    return os.path.join(CACHE_DIR, f"{ticker}_{interval}.pkl")
+
+
+def _remember(key, df):
+    with _MEM_LOCK:
+        _MEM_CACHE[key] = df
+        _MEM_CACHE.move_to_end(key)
+        if len(_MEM_CACHE) > MEM_CACHE_MAX:
+            _MEM_CACHE.popitem(last=False)
+
+
+def _load_cache(ticker, interval):
+    """Return the cached frame, or None if missing, stale or unreadable."""
+    key = (ticker, interval)
+    with _MEM_LOCK:
+        df = _MEM_CACHE.get(key)
+        if df is not None:
+            _MEM_CACHE.move_to_end(key)
+    if df is None:
+        try:
+            df = pd.read_pickle(_cache_path(ticker, interval))
+        except Exception:
+            return None
+        _remember(key, df)
+    # Age is measured from the last full fetch; incremental saves do not reset it
+    if time.time() - df.attrs.get("cached_at", 0) > CACHE_MAX_AGE:
+        return None
+    return df.copy()
+
+
+def _save_cache(ticker, interval, df):
+    """Persist a frame atomically so a crash never leaves a half-written file."""
+    _remember((ticker, interval), df.copy())
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _cache_path(ticker, interval)
+    try:
+        write_atomic(path, df.to_pickle)
+    except Exception as e:
+        print(f"⚠️ Could not cache {ticker} [{interval}]: {e}")
+
+
+def _split_frames(raw, tickers):
+    """Slice a (possibly multi-ticker) download into {ticker: frame} with lowercase columns."""
+    frames = {}
+    if raw is None or raw.empty:
+        return frames
+
+    # Multi-ticker intraday downloads come back in UTC; convert once per frame
+    if raw.index.tz is not None:
+        raw.index = raw.index.tz_convert("Asia/Kolkata")
+
+    for t in tickers:
+        if isinstance(raw.columns, pd.MultiIndex):
+            if t not in raw.columns.get_level_values(0):
+                continue
+            df = raw.xs(t, axis=1, level=0)
+        else:
+            df = raw
+        # dropna hands back a new frame, so the raw download is never aliased
+        df = df.dropna(how="all").rename(columns=str.lower)
+        if not df.empty:
+            frames[t] = df
+    return frames
+
+
+def _fetch_ohlcv(tickers, interval, period):
+    """
+    Return ({ticker: frame}, set of tickers with fresh rows) for one interval,
+    going through the disk cache. Cold tickers get the full `period`; warm ones
+    only fetch from one day before their last cached bar (Yahoo's start bound is
+    inclusive of whole days) and the overlap is resolved in favour of the fresh
+    rows, which fixes up partial bars. Fresh rows carry no indicator values yet.
+    """
+    cached = {t: _load_cache(t, interval) for t in tickers}
+    warm = [t for t in tickers if cached[t] is not None and not cached[t].empty]
+    cold = [t for t in tickers if t not in warm]
+
+    fresh = {}
+    if cold:
+        try:
+            raw = _download(" ".join(cold), interval, period=period, threads=True, group_by="ticker")
+            fresh.update(_split_frames(raw, cold))
+        except Exception as e:
+            print(f"❌ Error fetching {interval} for {cold}: {e}")
+    if warm:
+        last_ts = min(cached[t].index.max() for t in warm)
+        start = (last_ts - pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+        try:
+            raw = _download(" ".join(warm), interval, start=start, threads=True, group_by="ticker")
+            fresh.update(_split_frames(raw, warm))
+        except Exception as e:
+            # Serve the cached history rather than dropping the tickers
+            print(f"⚠️ Incremental {interval} fetch failed for {warm}, using cache: {e}")
+
+    frames = {}
+    for t in tickers:
+        df = fresh.get(t)
+        cached_at = time.time()
+        if t in warm:
+            cached_at = cached[t].attrs.get("cached_at", cached_at)
+            if df is not None:
+                df = pd.concat([cached[t], df])
+                df = df[~df.index.duplicated(keep="last")].sort_index()
+            else:
+                df = cached[t]
+        if df is None or df.empty:
+            continue
+        df.attrs["cached_at"] = cached_at
+        frames[t] = df
+    return frames, set(fresh)
+
+
+def indicator_mask(needed_indicators=None):
+    """
+    Bitmask of the indicator groups add_indicators must produce for a list of
+    names (all of them when None). An int is taken as an already built mask.
+    """
+    if needed_indicators is None:
+        return IND_ALL
+    if isinstance(needed_indicators, int):
+        return needed_indicators
+    mask = 0
+    for name in needed_indicators:
+        mask |= _COL_BITS.get(name, 0)
+    # The whole MACD chain is built from ema12/ema26 and kept so it can resume
+    if mask & IND_MACD:
+        mask |= IND_EMA[12] | IND_EMA[26]
+    return mask
+
+
+@lru_cache(maxsize=None)
+def _mask_cols(mask):
+    """Indicator columns produced for a mask, in INDICATOR_COLS order."""
+    return tuple(c for c in INDICATOR_COLS if _COL_BITS[c] & mask)
+
+
+def _first_stale_row(df, cols):
+    """Position of the first row whose indicators still have to be computed."""
+    if not set(cols).issubset(df.columns):
+        return 0
+    stale = df[list(cols)].isna().to_numpy().any(axis=1)
+    return int(stale.argmax()) if stale.any() else len(df)
+
+
+def add_indicators(df, needed_indicators=None, ema200=None):
+    """
+    Compute the requested EMA, MACD, RSI and ATR columns on an OHLCV frame with
+    lowercase columns (all of them when `needed_indicators` is None).
+    `needed_indicators` is a list of names or a mask from indicator_mask().
+    If the frame already carries indicator values (a cached frame extended with
+    new bars), only the rows after the last complete one are computed, resuming
+    each recurrence from its cached state.
+    `ema200` may carry a precomputed column (from the batched FFT path) aligned
+    with the NaN-free close rows; it is only used for a full computation.
+    Rows still warming up (NaN indicators) are dropped.
+
+    OHLCV and indicator columns are float32 to halve memory traffic; strategies
+    must not rely on float64 precision (prices are rounded to 2 decimals anyway).
+    """
+    mask = indicator_mask(needed_indicators)
+    cols = _mask_cols(mask)
+    df.dropna(subset=["close"], inplace=True)
+    df[OHLCV_COLS] = df[OHLCV_COLS].astype(np.float32)
+    df["time"] = df.index
+    if not mask:
+        return df
+
+    start = _first_stale_row(df, cols)
+    if start == len(df):
+        return df
+
+    # === Indicators ===
+    # One float32 block holds every indicator row; kernels write into views of it
+    block = np.full((len(INDICATOR_COLS), len(df)), np.nan, dtype=np.float32)
+    rows = dict(zip(INDICATOR_COLS, block))
+    if start:
+        for c in cols:
+            rows[c][:start] = df[c].to_numpy()[:start]
+
+    close = df["close"].to_numpy()
+    spans = [s for s in EMA_SPANS if mask & IND_EMA[s]]
+    if ema200 is not None and start == 0 and 200 in spans:
+        spans.remove(200)
+        rows["ema200"][:] = ema200
+    if spans:
+        idx = [EMA_SPANS.index(s) for s in spans]
+        emas = ema_multi(close, EMA_ALPHAS[idx], block[idx], start)
+        block[idx] = emas
+
+    if mask & IND_MACD:
+        tail = slice(start, None)
+        np.subtract(rows["ema12"][tail], rows["ema26"][tail], out=rows["macd"][tail])
+        ema_multi(rows["macd"], SIGNAL_ALPHA, block[INDICATOR_COLS.index("signal")][None, :], start)
+        np.subtract(rows["macd"][tail], rows["signal"][tail], out=rows["hist"][tail])
+
+    if mask & IND_RSI:
+        rsi_wilder(close, 14, rows["rsi"], rows["rsi_gain"], rows["rsi_loss"], start)
+    if mask & IND_ATR:
+        atr_wilder(df["high"].to_numpy(), df["low"].to_numpy(), close, 14, rows["atr"], start)
+
+    cols = list(cols)
+    df[cols] = block[[INDICATOR_COLS.index(c) for c in cols]].T
+    df.dropna(subset=cols, inplace=True)
+    return df
+
+
+def _clean_ohlcv(df, ticker, tf):
+    """Lowercase columns, check OHLCV is present and drop rows missing a price."""
+    if df is None or df.empty:
+        print(f"⚠️ No data fetched for {ticker} [{tf}]")
+        return None
+
+    df.columns = [col.lower() for col in df.columns]
+
+    # ✅ Check essential columns
+    if not REQUIRED_COLS.issubset(df.columns):
+        print(f"⚠️ Missing essential columns for {ticker} [{tf}]: {list(df.columns)}")
+        return None
+
+    df = df.dropna(subset=OHLC_COLS)
+    if df.empty:
+        print(f"⚠️ No data fetched for {ticker} [{tf}]")
+        return None
+    return df
+
+
+def _prepare_frame(df, ticker, tf, needed_indicators=None, ema200=None):
+    """Clean an OHLCV frame and add indicators. Returns None if unusable."""
+    df = _clean_ohlcv(df, ticker, tf)
+    if df is None:
+        return None
+
+    df = add_indicators(df, needed_indicators, ema200=ema200)
+    if df.empty:
+        print(f"⚠️ No usable rows for {ticker} [{tf}]")
+        return None
+    # Lowercase and OHLC-complete: strategies' ensure_normalized skips its pass
+    df.attrs["_normalized"] = True
+    return df
+
+
+def get_multi_timeframes(ticker, needed_indicators=None, timeframes=TIMEFRAMES, prefetch=None):
     """
     Fetch OHLCV data for multiple timeframes and precompute indicators.
-    Supported: 1d, 1h, 5m
-    Returns a dict of DataFrames with computed EMA, MACD, RSI, ATR.
+    `timeframes` maps interval -> history period (default: 1d, 1h, 5m).
+    `prefetch` is a fetch_all_timeframes() result for the whole watchlist;
+    tickers found in it are served from it without any download.
+    Returns a dict of DataFrames keyed by interval.
     """
+    if prefetch is not None and ticker in prefetch:
+        return {tf: df for tf, df in prefetch[ticker].items() if tf in timeframes}
+    return fetch_all_timeframes([ticker], needed_indicators, timeframes).get(ticker, {})
+
+
+def _fetch_batch(chunk, tf, period, needed_indicators=None):
+    """Fetch one timeframe for a chunk of tickers and return {ticker: DataFrame}."""
+    frames = {}
+    try:
+        raw_frames, fresh = _fetch_ohlcv(chunk, tf, period)
+    except Exception as e:
+        print(f"❌ Error fetching {tf} batch {chunk}: {e}")
+        return frames
 
-    intervals = {"1d": "1y", "1h": "60d", "5m": "7d"}
-    data = {}
+    clean = {}
+    for t in chunk:
+        df = raw_frames.get(t)
+        # Frames from _fetch_ohlcv are owned by this call (fresh, concat or just unpickled)
+        df = _clean_ohlcv(df, t, tf)
+        if df is not None:
+            clean[t] = df
 
-    for tf, period in intervals.items():
+    # The long ema200 kernel is done in one FFT convolution for every frame that
+    # needs a full computation; cached frames extend it with the recurrence
+    mask = indicator_mask(needed_indicators)
+    cols = _mask_cols(mask)
+    full = {t: df for t, df in clean.items() if _first_stale_row(df, cols) == 0}
+    ema200 = _batch_ema(full, 200) if mask & IND_EMA[200] else {}
+
+    for t, df in clean.items():
         try:
-            df = yf.download(
-                tickers=ticker,
-                period=period,
-                interval=tf,
-                progress=False,
-                threads=False,
-                auto_adjust=False
-            )
+            df = _prepare_frame(df, t, tf, mask, ema200=ema200.get(t))
+            if df is not None:
+                frames[t] = df
+                if t in fresh:
+                    _save_cache(t, tf, df)
+        except Exception as e:
+            print(f"❌ Error processing {t} for {tf}: {e}")
 
-            # ✅ Flatten MultiIndex columns if present
-            if isinstance(df.columns, pd.MultiIndex):
-                df.columns = [col[0].lower() for col in df.columns]
-            else:
-                df.columns = [col.lower() for col in df.columns]
+    return frames
 
-            if df is None or df.empty:
-                print(f"⚠️ No data fetched for {ticker} [{tf}]")
-                continue
 
-            # ✅ Check essential columns
-            required_cols = {"open", "high", "low", "close", "volume"}
-            if not required_cols.issubset(df.columns):
-                print(f"⚠️ Missing essential columns for {ticker} [{tf}]: {list(df.columns)}")
-                continue
+def _batch_ema(frames, span):
+    """
+    EMA of close for several tickers at once. Series are stacked right-aligned
+    into a (T, N) matrix, left-padded with their first close so the padding does
+    not move the EMA, and run through ema_fft together.
+    Returns {ticker: ndarray} aligned with each frame's rows.
+    """
+    if not frames:
+        return {}
+    closes = {t: df["close"].to_numpy(dtype=np.float64) for t, df in frames.items()}
+    T = max(len(c) for c in closes.values())
+    matrix = np.empty((T, len(closes)))
+    for j, c in enumerate(closes.values()):
+        matrix[:T - len(c), j] = c[0]
+        matrix[T - len(c):, j] = c
+    emas = ema_fft(matrix, span)
+    return {t: emas[T - len(c):, j] for j, (t, c) in enumerate(closes.items())}
 
-            df.dropna(subset=["close"], inplace=True)
-            df["time"] = df.index
 
-            # === Indicators ===
-            df["ema20"] = df["close"].ewm(span=20, adjust=False).mean()
-            df["ema50"] = df["close"].ewm(span=50, adjust=False).mean()
-            df["ema200"] = df["close"].ewm(span=200, adjust=False).mean()
+def fetch_all_timeframes(tickers, needed_indicators=None, timeframes=TIMEFRAMES):
+    """
+    Batched counterpart of get_multi_timeframes for a whole watchlist.
+    Issues one yf.download per timeframe for every BATCH_SIZE tickers
+    instead of one per ticker per timeframe. Batches run on a thread pool
+    so indicator work on one batch overlaps the download of the next.
+    Returns {ticker: {tf: DataFrame}}.
+    """
+    tickers = list(tickers)
+    data = {t: {} for t in tickers}
+    # Resolved once per run; every batch and frame branches on the same mask
+    mask = indicator_mask(needed_indicators)
 
-            df["ema12"] = df["close"].ewm(span=12, adjust=False).mean()
-            df["ema26"] = df["close"].ewm(span=26, adjust=False).mean()
-            df["macd"] = df["ema12"] - df["ema26"]
-            df["signal"] = df["macd"].ewm(span=9, adjust=False).mean()
-            df["hist"] = df["macd"] - df["signal"]
+    jobs = [
+        (tickers[i:i + BATCH_SIZE], tf, period)
+        for tf, period in timeframes.items()
+        for i in range(0, len(tickers), BATCH_SIZE)
+    ]
+    if not jobs:
+        return data
 
-            df["rsi"] = ta.rsi(df["close"], length=14)
-            df["atr"] = ta.atr(df["high"], df["low"], df["close"], length=14)
+    with ThreadPoolExecutor(max_workers=min(len(jobs), MAX_WORKERS)) as ex:
+        futures = {
+            ex.submit(_fetch_batch, chunk, tf, period, mask): tf
+            for chunk, tf, period in jobs
+        }
+        for fut in as_completed(futures):
+            tf = futures[fut]
+            for t, df in fut.result().items():
+                data[t][tf] = df
 
-            df.dropna(inplace=True)
-            data[tf] = df
+    for t, frames in data.items():
+        # Keep timeframe order stable regardless of which batch finished first
+        data[t] = frames = {tf: frames[tf] for tf in timeframes if tf in frames}
+        if not frames:
+            print(f"🚫 No valid timeframes available for {t}")
+        else:
+            print(f"✅ Data fetched for {t}: {list(frames.keys())}")
 
+    return data
+
+
+def fetch_last_prices(symbols, period="1d", interval="1m"):
+    """
+    Latest close for each symbol, using one batched download per BATCH_SIZE symbols.
+    Returns {symbol: price}; symbols without data are left out.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    prices = {}
+    for i in range(0, len(symbols), BATCH_SIZE):
+        chunk = symbols[i:i + BATCH_SIZE]
+        try:
+            raw = _download(" ".join(chunk), interval, period=period, threads=True, group_by="ticker")
         except Exception as e:
-            print(f"❌ Error fetching {ticker} for {tf}: {e}")
+            print(f"❌ Error fetching live prices for {chunk}: {e}")
             continue
+        for t, df in _split_frames(raw, chunk).items():
+            # Last non-NaN close straight off the numpy buffer
+            close = df["close"].to_numpy(dtype=float)
+            valid = np.flatnonzero(~np.isnan(close))
+            if valid.size:
+                prices[t] = float(close[valid[-1]])
+    return prices
 
-    if not data:
-        print(f"🚫 No valid timeframes available for {ticker}")
+
+def _spark_closes(payload):
+    """Yield (symbol, closes) from either layout the spark endpoint answers with."""
+    if "spark" in payload:
+        for item in payload["spark"].get("result") or []:
+            for resp in item.get("response") or []:
+                quote = (resp.get("indicators", {}).get("quote") or [{}])[0]
+                yield item.get("symbol"), quote.get("close") or []
     else:
-        print(f"✅ Data fetched for {ticker}: {list(data.keys())}")
+        for sym, item in payload.items():
+            if isinstance(item, dict):
+                yield sym, item.get("close") or []
 
-    return data
+
+def fetch_live_prices_bulk(symbols, period="1d", interval="1m", refresh=False):
+    """
+    Latest price per symbol from Yahoo's spark endpoint: one pooled GET per
+    BATCH_SIZE symbols, no DataFrame construction. Symbols the endpoint does
+    not answer for fall back to fetch_last_prices. Prices fetched within the
+    last PRICE_TTL seconds are served from memory unless `refresh` is set.
+    Returns {symbol: price}.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    cached = {}
+    if not refresh:
+        now = time.time()
+        with _PRICE_LOCK:
+            for sym in symbols:
+                hit = _PRICE_CACHE.get((sym, period, interval))
+                if hit is not None and now - hit[0] < PRICE_TTL:
+                    cached[sym] = hit[1]
+    missing = [s for s in symbols if s not in cached]
+    prices = _fetch_live_prices(missing, period, interval) if missing else {}
+
+    now = time.time()
+    with _PRICE_LOCK:
+        for sym, price in prices.items():
+            _PRICE_CACHE[(sym, period, interval)] = (now, price)
+    prices.update(cached)
+    return prices
+
+
+def _fetch_live_prices(symbols, period, interval):
+    """Uncached spark fetch behind fetch_live_prices_bulk."""
+    prices = {}
+    for i in range(0, len(symbols), BATCH_SIZE):
+        chunk = symbols[i:i + BATCH_SIZE]
+        try:
+            resp = SESSION.get(
+                SPARK_URL,
+                params={"symbols": ",".join(chunk), "range": period, "interval": interval},
+                headers=SPARK_HEADERS,
+                timeout=10,
+            )
+            resp.raise_for_status()
+            for sym, closes in _spark_closes(resp.json()):
+                closes = [c for c in closes if c is not None]
+                if sym in chunk and closes:
+                    prices[sym] = float(closes[-1])
+        except Exception as e:
+            print(f"⚠️ Spark quote fetch failed for {chunk}: {e}")
+
+    missing = [s for s in symbols if s not in prices]
+    if missing:
+        prices.update(fetch_last_prices(missing, period=period, interval=interval))
+    return prices
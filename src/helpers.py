@@ -2,20 +2,69 @@
 import os
 import json
 import csv
+import threading
 import pytz
 from datetime import datetime
+from dotenv import load_dotenv
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback
+    orjson = None
+
+IST = pytz.timezone("Asia/Kolkata")
+
+# Write buffer for append_csv: a whole batch of rows reaches the OS in one write
+CSV_BUFFER = 1 << 20
+
+def load_env():
+    """Load .env once per process; the marker is inherited by worker processes too."""
+    if not os.environ.get("_ENV_LOADED"):
+        load_dotenv()
+        os.environ["_ENV_LOADED"] = "1"
 
 def now_ist():
     """Return current datetime in Asia/Kolkata timezone."""
-    return datetime.now(pytz.timezone("Asia/Kolkata"))
+    return datetime.now(IST)
 
 def save_json(obj, path):
-    """Save Python object to JSON file (ensure folder exists)."""
+    """Save Python object to JSON file (ensure folder exists), replacing it atomically."""
     dirpath = os.path.dirname(path)
     if dirpath:
         os.makedirs(dirpath, exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(obj, f, indent=2, default=str, ensure_ascii=False)
+    if orjson is not None:
+        data = orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY, default=str)
+    else:
+        data = json.dumps(obj, indent=2, default=str, ensure_ascii=False).encode("utf-8")
+    # Readers (dashboards, the next run) never see a half-written file
+    def write(tmp):
+        with open(tmp, "wb") as f:
+            f.write(data)
+    write_atomic(path, write)
+
+def write_atomic(path, write):
+    """
+    Call write(tmp) on a temp file next to `path`, then rename it over `path`.
+    The temp name is per process and thread, so overlapping writers (a /run job
+    and a cron run) never rename each other's half-written file into place;
+    it is removed if writing fails.
+    """
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+def load_json(path):
+    """Read a JSON file (orjson when available, stdlib json otherwise)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    return orjson.loads(data) if orjson is not None else json.loads(data)
 
 def _normalize_cell(val):
     """Normalize value for CSV cell (serialize complex types)."""
@@ -28,11 +77,26 @@ def _normalize_cell(val):
             return str(val)
     return val
 
+def _scalar_cell(val):
+    return "" if val is None else val
+
+def _column_serializers(fieldnames, rows):
+    """One serializer per column: JSON only for columns that actually hold dicts/lists."""
+    json_cols = {k for r in rows for k, v in r.items() if isinstance(v, (dict, list))}
+    return [_normalize_cell if fn in json_cols else _scalar_cell for fn in fieldnames]
+
+def _write_rows(writer, fieldnames, rows):
+    """Write dict rows positionally through csv.writer using per-column serializers."""
+    sers = _column_serializers(fieldnames, rows)
+    cols = list(zip(sers, fieldnames))
+    writer.writerows([ser(r.get(fn, "")) for ser, fn in cols] for r in rows)
+
 def append_csv(data, filename):
     """
     Append list-of-dicts to CSV file. If file exists and new rows contain
     keys not present in the existing header, rewrite the CSV with the
     combined header (preserving old rows) and append new rows.
+    Otherwise only the header line is read, so appends cost O(rows added).
     Accepts a single dict or a list of dicts.
     """
     # Normalize input
@@ -59,12 +123,10 @@ def append_csv(data, filename):
             if k not in new_fieldnames:
                 new_fieldnames.append(k)
 
-    # If file exists read existing header and rows
+    # If file exists read only its header; old rows are needed just for a rewrite
     if os.path.exists(filename):
         with open(filename, "r", encoding="utf-8", newline="") as rf:
-            reader = csv.DictReader(rf)
-            existing_fieldnames = reader.fieldnames or []
-            existing_rows = list(reader)
+            existing_fieldnames = next(csv.reader(rf), [])
 
         # Build final fieldnames preserving existing order first
         final_fieldnames = list(existing_fieldnames)
@@ -74,30 +136,21 @@ def append_csv(data, filename):
 
         # If final header is different from existing, rewrite file completely
         if set(final_fieldnames) != set(existing_fieldnames):
-            with open(filename, "w", encoding="utf-8", newline="") as wf:
-                writer = csv.DictWriter(wf, fieldnames=final_fieldnames)
-                writer.writeheader()
-                # write old rows (ensure they have all final fields)
-                for r in existing_rows:
-                    out = {fn: _normalize_cell(r.get(fn, "")) for fn in final_fieldnames}
-                    writer.writerow(out)
-                # write new rows
-                for r in rows:
-                    out = {fn: _normalize_cell(r.get(fn, "")) for fn in final_fieldnames}
-                    writer.writerow(out)
+            with open(filename, "r", encoding="utf-8", newline="") as rf:
+                existing_rows = list(csv.DictReader(rf))
+            with open(filename, "w", encoding="utf-8", newline="", buffering=CSV_BUFFER) as wf:
+                writer = csv.writer(wf)
+                writer.writerow(final_fieldnames)
+                # old rows come back from the CSV as plain strings
+                _write_rows(writer, final_fieldnames, existing_rows)
+                _write_rows(writer, final_fieldnames, rows)
         else:
-            # Safe to append with existing header
-            with open(filename, "a", encoding="utf-8", newline="") as af:
-                writer = csv.DictWriter(af, fieldnames=existing_fieldnames)
-                for r in rows:
-                    # only include fields that writer expects
-                    row_out = {k: _normalize_cell(v) for k, v in r.items() if k in existing_fieldnames}
-                    writer.writerow(row_out)
+            # Safe to append with existing header (extra keys are dropped)
+            with open(filename, "a", encoding="utf-8", newline="", buffering=CSV_BUFFER) as af:
+                _write_rows(csv.writer(af), existing_fieldnames, rows)
     else:
         # File does not exist: create it with new_fieldnames header
-        with open(filename, "w", encoding="utf-8", newline="") as wf:
-            writer = csv.DictWriter(wf, fieldnames=new_fieldnames)
-            writer.writeheader()
-            for r in rows:
-                out = {fn: _normalize_cell(r.get(fn, "")) for fn in new_fieldnames}
-                writer.writerow(out)
+        with open(filename, "w", encoding="utf-8", newline="", buffering=CSV_BUFFER) as wf:
+            writer = csv.writer(wf)
+            writer.writerow(new_fieldnames)
+            _write_rows(writer, new_fieldnames, rows)
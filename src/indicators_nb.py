@@ -0,0 +1,150 @@
+# src/indicators_nb.py
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True, fastmath=True)
+def ema_multi(close, alphas, out, start=0):
+    """
+    Exponential moving averages (pandas `adjust=False` semantics) for several
+    smoothing factors in a single pass over `close`.
+    out[k, i] receives the EMA for alphas[k] at bar i. Input must be NaN-free.
+    With start > 0, out[:, :start] is taken as already computed and the
+    recurrence resumes from out[:, start - 1].
+    """
+    n = close.shape[0]
+    m = alphas.shape[0]
+    if n == 0:
+        return out
+    if start == 0:
+        for k in range(m):
+            out[k, 0] = close[0]
+        start = 1
+    for i in range(start, n):
+        x = close[i]
+        for k in range(m):
+            out[k, i] = alphas[k] * x + (1.0 - alphas[k]) * out[k, i - 1]
+    return out
+
+
+@njit(cache=True)
+def rsi_wilder(close, n, out, gain, loss, start=0):
+    """
+    Wilder RSI in one pass: the first average gain/loss is the mean of the first
+    n changes, later ones are smoothed with weight 1/n. The running averages are
+    written to `gain`/`loss` so a later call can resume from `start` using
+    gain[start - 1]/loss[start - 1]. On a full run out[:n] is left NaN.
+    """
+    m = close.shape[0]
+    if start == 0:
+        out[:] = np.nan
+        gain[:] = np.nan
+        loss[:] = np.nan
+        if m <= n:
+            return out
+
+        g = 0.0
+        l = 0.0
+        for i in range(1, n + 1):
+            d = close[i] - close[i - 1]
+            if d > 0:
+                g += d
+            else:
+                l -= d
+        g /= n
+        l /= n
+        gain[n] = g
+        loss[n] = l
+        out[n] = 100.0 if l == 0.0 else 100.0 - 100.0 / (1.0 + g / l)
+        start = n + 1
+    else:
+        g = gain[start - 1]
+        l = loss[start - 1]
+
+    for i in range(start, m):
+        d = close[i] - close[i - 1]
+        g = (g * (n - 1) + (d if d > 0 else 0.0)) / n
+        l = (l * (n - 1) + (-d if d < 0 else 0.0)) / n
+        gain[i] = g
+        loss[i] = l
+        out[i] = 100.0 if l == 0.0 else 100.0 - 100.0 / (1.0 + g / l)
+    return out
+
+
+@njit(cache=True)
+def atr_wilder(high, low, close, n, out, start=0):
+    """
+    Wilder ATR in one pass. True range is high - low on the first bar and
+    max(high - low, |high - prev close|, |low - prev close|) afterwards; the first
+    ATR is the mean of n true ranges, later ones are smoothed with weight 1/n.
+    On a full run out[:n - 1] is left NaN; with start > 0 the smoothing resumes
+    from out[start - 1].
+    """
+    m = close.shape[0]
+    if start == 0:
+        out[:] = np.nan
+        if m < n:
+            return out
+        atr = 0.0
+        for i in range(n):
+            tr = high[i] - low[i]
+            if i > 0:
+                tr = max(tr, abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+            atr += tr / n
+        out[n - 1] = atr
+        start = n
+    else:
+        atr = out[start - 1]
+
+    for i in range(start, m):
+        tr = max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+        atr = (atr * (n - 1) + tr) / n
+        out[i] = atr
+    return out
+
+def ema_fft(close_matrix, span):
+    """
+    adjust=False EMA of every column of a (T, N) close matrix, computed as one
+    FFT convolution with the exponential kernel alpha * (1 - alpha)**t plus the
+    decayed seed term. Columns must be NaN-free; a shorter series can be
+    left-padded with its first value, which leaves its EMA unchanged.
+    """
+    x = np.asarray(close_matrix, dtype=np.float64)
+    T = x.shape[0]
+    alpha = 2.0 / (span + 1.0)
+    w = alpha * (1.0 - alpha) ** np.arange(T)
+    seed = (1.0 - alpha) ** np.arange(1, T + 1)
+
+    nfft = 1 << (2 * T - 1).bit_length()
+    spec = np.fft.rfft(x, nfft, axis=0) * np.fft.rfft(w, nfft)[:, None]
+    conv = np.fft.irfft(spec, nfft, axis=0)[:T]
+    return conv + seed[:, None] * x[0]
+
+
+@njit(cache=True, error_model="numpy")
+def classify_trades_nb(lp, entry, target, stop, side, code, pnl):
+    """
+    Outcome of each trade against its live price, written into `code`
+    (0 Open, 1 Target Hit, 2 SL Hit) and `pnl` (% move to the exit price).
+    side[i] is 1 for BUY, -1 for SELL, 0 otherwise; rows with side 0 or no live
+    price (NaN or 0) stay Open at 0%. Target wins when both levels are crossed.
+    """
+    for i in range(lp.shape[0]):
+        p = lp[i]
+        s = side[i]
+        code[i] = 0
+        pnl[i] = 0.0
+        if s == 0 or np.isnan(p) or p == 0.0:
+            continue
+        x = p
+        if (s == 1 and p >= target[i]) or (s == -1 and p <= target[i]):
+            code[i] = 1
+            x = target[i]
+        elif (s == 1 and p <= stop[i]) or (s == -1 and p >= stop[i]):
+            code[i] = 2
+            x = stop[i]
+        if s == 1:
+            pnl[i] = (x - entry[i]) / entry[i] * 100.0
+        else:
+            pnl[i] = (entry[i] - x) / entry[i] * 100.0
+    return code, pnl
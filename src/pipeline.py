@@ -1,49 +1,204 @@
 import os
 import json
 import argparse
+import importlib
+from concurrent.futures import ProcessPoolExecutor
 import pytz
+from collections import Counter, OrderedDict, defaultdict
 from datetime import datetime, time
 import requests
-import pandas as pd
-from dotenv import load_dotenv
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
-import yfinance as yf
+import numpy as np
 
 # === Local imports ===
-from src.helpers import save_json, append_csv, now_ist
-from src.stock_universe import build_watchlist
-from src.fetch_live_data import get_multi_timeframes
-from src.run_strategies import load_strategy_modules, get_required_indicators
-from src.utils.telegram_alert import send_telegram_message
+# Data/strategy modules (yfinance, numba kernels) are imported inside run()
+# so closed-market cron ticks return without paying for them
+from src.helpers import save_json, append_csv, now_ist, load_env
+from src.utils.telegram_alert import send_telegram_message, send_telegram_messages
+from src.utils.sheets import get_sheet
 
 # === Setup ===
-load_dotenv()
+load_env()
 SHEET_ID = os.getenv("SHEET_ID")
 SHEET_NAME = os.getenv("SHEET_NAME")
-SERVICE_ACCOUNT_FILE = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
-SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 
-creds = Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-sheet = build("sheets", "v4", credentials=creds).spreadsheets()
+# Market session (IST), resolved once per process
+IST = pytz.timezone("Asia/Kolkata")
+MARKET_OPEN = time(9, 15)
+MARKET_CLOSE = time(15, 30)
 
 # === Utility ===
 def ist_now():
-    return datetime.now(pytz.timezone("Asia/Kolkata"))
+    return datetime.now(IST)
 
 def is_market_open():
     now = ist_now()
-    return now.weekday() < 5 and time(9, 15) <= now.time() <= time(15, 30)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() <= MARKET_CLOSE
+
+# === Signal memo ===
+# generate_signal is a pure function of the bars it sees, so reruns that land
+# inside the same bar (and same last close) reuse the previous result
+SIG_CACHE_MAX = 10_000
+SIG_CACHE = OrderedDict()
+
+def _bar_key(mdf):
+    """Identify the latest bar of every timeframe by timestamp and close."""
+    return tuple(
+        (tf, df.index[-1].value, float(df["close"].iloc[-1]))
+        for tf, df in mdf.items() if not df.empty
+    )
+
+def _signal_key(name, ticker, mdf):
+    return (name, ticker, _bar_key(mdf))
+
+def _memo_get(key):
+    """(hit, signal) for a memo key, refreshing its LRU position on a hit."""
+    if key in SIG_CACHE:
+        SIG_CACHE.move_to_end(key)
+        return True, SIG_CACHE[key]
+    return False, None
+
+def _memo_put(key, sig):
+    SIG_CACHE[key] = dict(sig) if sig else sig
+    if len(SIG_CACHE) > SIG_CACHE_MAX:
+        SIG_CACHE.popitem(last=False)
+
+def cached_signal(name, mod, ticker, mdf):
+    """Run mod.generate_signal through an LRU keyed on (strategy, ticker, last bars)."""
+    if not mdf:
+        return mod.generate_signal(ticker, mdf)
+
+    key = _signal_key(name, ticker, mdf)
+    hit, sig = _memo_get(key)
+    if not hit:
+        sig = mod.generate_signal(ticker, mdf)
+        _memo_put(key, sig)
+
+    # Hand out a copy; the caller enriches the dict in place
+    return dict(sig) if sig else sig
+
+# === Strategy evaluation ===
+# Below this many tickers, process start-up costs more than it saves
+POOL_MIN_TICKERS = 8
+
+def evaluate_ticker(t, mdf, strategies, run_ts, batched=None):
+    """
+    Run every strategy on one ticker and return its enriched, confident signals.
+    `batched` holds this ticker's results ({name: signal or None}) from
+    strategies already evaluated through generate_signals_batch.
+    """
+    out = []
+    batched = batched or {}
+    try:
+        for name, mod in strategies:
+            if name in batched:
+                sig = dict(batched[name]) if batched[name] else None
+            else:
+                sig = cached_signal(name, mod, t, mdf)
+            # Skip empty and low-confidence signals before enriching them
+            if not sig or sig.get("Confidence", 0) < 0.3:
+                continue
+
+            sig["Strategy"] = sig.get("Strategy", name)
+            sig.setdefault("StrategyType", getattr(mod, "STRATEGY_TYPE", "daily"))
+            sig.setdefault("StopLoss", round(sig["Entry"] * 0.985, 2))
+            sig.setdefault("Target", round(sig["Entry"] * 1.015, 2))
+            sig["Timestamp"] = run_ts
+            out.append(sig)
+    except Exception as e:
+        print(f"Error processing {t}: {e}")
+    return out
+
+def _signals_in_worker(job):
+    """
+    Process-pool entry point: raw generate_signal results for the strategies
+    the parent's memo missed. Modules don't pickle, so strategies travel by
+    import path. A strategy that raises is left out, and the parent reruns it
+    so the error is reported as usual.
+    """
+    t, mdf, strategy_paths = job
+    sigs = {}
+    for name, path in strategy_paths:
+        try:
+            sigs[name] = importlib.import_module(path).generate_signal(t, mdf)
+        except Exception:
+            pass
+    return t, sigs
+
+def batch_signals(watchlist, all_data, strategies):
+    """
+    {ticker: {name: signal or None}} for the strategies that expose
+    generate_signals_batch (one vectorized call over the whole watchlist).
+    A strategy whose batch call fails is left to the per-ticker path.
+    """
+    batched = defaultdict(dict)
+    for name, mod in strategies:
+        if not hasattr(mod, "generate_signals_batch"):
+            continue
+        try:
+            results = mod.generate_signals_batch(watchlist, all_data)
+        except Exception as e:
+            print(f"⚠️ Batch evaluation failed for {name}, running per ticker: {e}")
+            continue
+        for t in watchlist:
+            batched[t][name] = results.get(t)
+    return batched
+
+def evaluate_watchlist(watchlist, all_data, strategies, run_ts):
+    """
+    Evaluate all tickers. Signals come from the batch screens first, then from
+    the signal memo; only the remaining misses fan out to a process pool (for
+    larger watchlists), and their results are memoized here in the parent so
+    the next run can reuse them.
+    """
+    batched = batch_signals(watchlist, all_data, strategies)
+    jobs = []
+    for t in watchlist:
+        mdf = all_data.get(t, {})
+        if not mdf:
+            continue
+        misses = []
+        for name, mod in strategies:
+            if name in batched[t]:
+                continue
+            hit, sig = _memo_get(_signal_key(name, t, mdf))
+            if hit:
+                batched[t][name] = sig
+            else:
+                misses.append((name, mod.__name__))
+        if misses:
+            jobs.append((t, mdf, misses))
+
+    # Few misses are cheaper in-process; evaluate_ticker runs them through cached_signal
+    if len(jobs) >= POOL_MIN_TICKERS:
+        ncpu = os.cpu_count() or 1
+        from strategies._warmup import warmup
+        # Workers load the strategy kernels once up front, not inside the first job
+        with ProcessPoolExecutor(max_workers=ncpu, initializer=warmup) as ex:
+            for t, sigs in ex.map(_signals_in_worker, jobs, chunksize=max(1, len(jobs) // (4 * ncpu))):
+                mdf = all_data[t]
+                for name, sig in sigs.items():
+                    _memo_put(_signal_key(name, t, mdf), sig)
+                    batched[t][name] = sig
+
+    return [
+        sig for t in watchlist
+        for sig in evaluate_ticker(t, all_data.get(t, {}), strategies, run_ts, batched.get(t))
+    ]
 
 # === Google Sheets ===
 def send_to_google_sheets(signals):
     """Append all signals to the Google Sheet"""
     if not signals:
         return
+    sheet = get_sheet()
+    if sheet is None:
+        return
 
+    # Formatted once for the whole batch, only used by signals without a Timestamp
+    default_ts = ist_now().strftime("%d/%m/%Y %H:%M:%S")
     rows = [
         [
-            s.get("Timestamp", ist_now().strftime("%d/%m/%Y %H:%M:%S")),
+            s.get("Timestamp", default_ts),
             s["Stock"], s["Side"], s["Entry"], s["Target"], s["StopLoss"],
             s.get("Confidence", ""), s["Strategy"], s["StrategyType"]
         ]
@@ -63,15 +218,19 @@ def send_to_google_sheets(signals):
         print(f"❌ Google Sheet update failed: {e}")
 
 # === Telegram Alerts (High Confidence Only) ===
-def send_high_confidence_trades(signals, min_confidence=0.8, limit=5):
-    """Send only high-confidence trades to Telegram."""
-    high_conf = [s for s in signals if s.get("Confidence", 0) >= min_confidence]
-    if not high_conf:
+def format_high_confidence_trades(signals, min_confidence=0.8, limit=5):
+    """(Telegram text, trade count) for the top high-confidence trades; (None, 0) if there are none."""
+    conf = np.fromiter((s.get("Confidence", 0) for s in signals), dtype=float, count=len(signals))
+    idx = np.flatnonzero(conf >= min_confidence)
+    if idx.size == 0:
         print("⚠️ No high-confidence trades to send.")
-        return
+        return None, 0
 
-    # Sort & limit
-    top_signals = sorted(high_conf, key=lambda x: x["Confidence"], reverse=True)[:limit]
+    # Top-k by confidence: O(N) partition, then order only the k survivors
+    if idx.size > limit:
+        idx = idx[np.argpartition(-conf[idx], limit - 1)[:limit]]
+    idx = idx[np.argsort(-conf[idx], kind="stable")]
+    top_signals = [signals[i] for i in idx]
 
     msg = "🚀 *High-Confidence Trade Signals*\n\n"
     for s in top_signals:
@@ -82,68 +241,73 @@ def send_high_confidence_trades(signals, min_confidence=0.8, limit=5):
             f"⚡ Confidence: {s.get('Confidence', 0):.2f}\n\n"
         )
     msg += f"📊 Showing top {len(top_signals)} high-confidence trades."
+    return msg, len(top_signals)
+
+def send_high_confidence_trades(signals, min_confidence=0.8, limit=5):
+    """Send only high-confidence trades to Telegram."""
+    msg, count = format_high_confidence_trades(signals, min_confidence, limit)
+    if msg is None:
+        return
 
     try:
         send_telegram_message(msg)
-        print(f"✅ Sent {len(top_signals)} high-confidence trades to Telegram.")
+        print(f"✅ Queued {count} high-confidence trades for Telegram.")
     except Exception as e:
         print(f"⚠️ Telegram send failed: {e}")
 
 # === Evaluate PnL ===
 def evaluate_pnl(signals):
-    results = []
-    for s in signals:
-        try:
-            df = yf.download(s["Stock"], period="1d", interval="1m", progress=False, auto_adjust=True)
-            if df.empty:
-                continue
-            last_price = round(df["Close"].iloc[-1], 2)
-
-            entry, target, stop, side = s["Entry"], s["Target"], s["StopLoss"], s["Side"]
-
-            if side == "BUY":
-                if last_price >= target:
-                    pnl, status = ((target - entry) / entry) * 100, "Target Hit"
-                elif last_price <= stop:
-                    pnl, status = ((stop - entry) / entry) * 100, "SL Hit"
-                else:
-                    pnl, status = ((last_price - entry) / entry) * 100, "Open"
-            else:  # SELL
-                if last_price <= target:
-                    pnl, status = ((entry - target) / entry) * 100, "Target Hit"
-                elif last_price >= stop:
-                    pnl, status = ((entry - stop) / entry) * 100, "SL Hit"
-                else:
-                    pnl, status = ((entry - last_price) / entry) * 100, "Open"
-
-            results.append({
-                "Stock": s["Stock"], "Strategy": s["Strategy"], "Side": side,
-                "Result": status, "PnL%": round(pnl, 2)
-            })
-        except Exception as e:
-            print(f"Error evaluating {s['Stock']}: {e}")
-    return results
+    """Mark every signal against its latest price (vectorized, see classify_trades)."""
+    if not signals:
+        return []
+
+    import pandas as pd
+    from src.fetch_live_data import fetch_last_prices
+    from src.pnl_tracker import classify_trades
+
+    prices = fetch_last_prices([s["Stock"] for s in signals])
+    sig_df = pd.DataFrame(signals)[["Stock", "Strategy", "Side", "Entry", "Target", "StopLoss"]]
+    sig_df["Last"] = sig_df["Stock"].map(prices)
+    sig_df = sig_df.dropna(subset=["Last"])
+    if sig_df.empty:
+        return []
+
+    sig_df["Result"], sig_df["PnL%"] = classify_trades(
+        sig_df["Last"].round(2).to_numpy(dtype=float),
+        sig_df["Entry"].to_numpy(dtype=float),
+        sig_df["Target"].to_numpy(dtype=float),
+        sig_df["StopLoss"].to_numpy(dtype=float),
+        sig_df["Side"].to_numpy(),
+    )
+    return sig_df[["Stock", "Strategy", "Side", "Result", "PnL%"]].to_dict("records")
 
 # === EOD Summary ===
-def send_eod_summary(results):
+def format_eod_summary(results):
+    """Telegram text summarising the evaluated trades."""
     if not results:
-        send_telegram_message("⚠️ No trades today to evaluate.")
-        return
-
-    df = pd.DataFrame(results)
-    total = len(df)
-    hits = len(df[df["Result"] == "Target Hit"])
-    losses = len(df[df["Result"] == "SL Hit"])
-    open_trades = len(df[df["Result"] == "Open"])
+        return "⚠️ No trades today to evaluate."
+
+    # One pass: result counts plus per-strategy PnL sum/count
+    counts = Counter()
+    strat_sum = defaultdict(lambda: [0.0, 0])
+    for r in results:
+        counts[r["Result"]] += 1
+        acc = strat_sum[r["Strategy"]]
+        pnl = r["PnL%"]
+        if pnl == pnl:  # NaN-skipping, like groupby().mean()
+            acc[0] += pnl
+            acc[1] += 1
+
+    total = len(results)
+    hits = counts["Target Hit"]
+    losses = counts["SL Hit"]
+    open_trades = counts["Open"]
     winrate = round((hits / (hits + losses)) * 100, 2) if (hits + losses) > 0 else 0
 
-    strat_perf = (
-        df.groupby("Strategy")["PnL%"]
-        .mean()
-        .sort_values(ascending=False)
-        .round(2)
-        .to_dict()
-    )
+    strat_perf = dict(sorted(
+        ((k, round(v[0] / v[1], 2) if v[1] else float("nan")) for k, v in strat_sum.items()),
+        key=lambda kv: kv[1], reverse=True,
+    ))
 
     msg = (
         f"📊 *End-of-Day Summary*\n\n"
@@ -157,7 +321,10 @@ def send_eod_summary(results):
     for strat, pnl in strat_perf.items():
         msg += f"• {strat}: {pnl}% avg PnL\n"
     msg += "\n💹 System evaluated all trades automatically."
-    send_telegram_message(msg)
+    return msg
+
+def send_eod_summary(results):
+    send_telegram_message(format_eod_summary(results))
     print("✅ Telegram EOD summary sent.")
 
 # === Main Runner ===
@@ -166,33 +333,21 @@ def run(dry_run=True, pool=None):
         print("⏸ Market closed — skipping automation run.")
         return []
 
+    from src.stock_universe import build_watchlist
+    from src.fetch_live_data import fetch_all_timeframes
+    from src.run_strategies import load_strategy_modules, get_required_indicators
+    from strategies._warmup import warmup
+
     print("⚙️ Loading strategies...")
     strategies = load_strategy_modules()
+    warmup()
     needed_indicators = get_required_indicators(strategies)
     watchlist = build_watchlist(pool_tickers=pool)
-    signals = []
+    # Every signal of one pass shares the same timestamp
+    run_ts = ist_now().strftime("%d/%m/%Y %H:%M:%S")
 
-    for t in watchlist:
-        try:
-            mdf = get_multi_timeframes(t, needed_indicators)
-            for name, mod in strategies:
-                sig = mod.generate_signal(t, mdf)
-                if not sig:
-                    continue
-
-                sig["Strategy"] = sig.get("Strategy", name)
-                sig.setdefault("StrategyType", getattr(mod, "STRATEGY_TYPE", "daily"))
-                sig.setdefault("StopLoss", round(sig["Entry"] * 0.985, 2))
-                sig.setdefault("Target", round(sig["Entry"] * 1.015, 2))
-                sig["Timestamp"] = ist_now().strftime("%d/%m/%Y %H:%M:%S")
-
-                # Skip low-confidence signals
-                if sig.get("Confidence", 0) < 0.3:
-                    continue
-
-                signals.append(sig)
-        except Exception as e:
-            print(f"Error processing {t}: {e}")
+    all_data = fetch_all_timeframes(watchlist, needed_indicators)
+    signals = evaluate_watchlist(watchlist, all_data, strategies, run_ts)
 
     if not signals:
         print("⚠️ No signals found.")
@@ -201,7 +356,9 @@ def run(dry_run=True, pool=None):
     save_json(signals, "output/live_signals.json")
     append_csv(signals, "output/trade_log.csv")
     send_to_google_sheets(signals)
-    send_high_confidence_trades(signals, min_confidence=0.8, limit=3)
+
+    # Everything user-facing from this pass goes out as one Telegram post
+    pending = [format_high_confidence_trades(signals, min_confidence=0.8, limit=3)[0]]
 
     print(f"✅ Logged {len(signals)} trades to Google Sheet.")
 
@@ -209,16 +366,25 @@ def run(dry_run=True, pool=None):
     try:
         print("\n🔁 Running automatic PnL tracker after trade generation...")
         from src.pnl_tracker import run as run_pnl
-        run_pnl()
+        # Its EOD summary rides along in this run's single Telegram post
+        pending.append(run_pnl(send=False))
         print("✅ PnL tracker completed successfully.\n")
     except Exception as e:
         print(f"⚠️ Error running PnL tracker automatically: {e}")
 
     # === EOD Summary at 3:30 PM ===
     now = ist_now().time()
-    if now >= time(15, 30):
+    if now >= MARKET_CLOSE:
         results = evaluate_pnl(signals)
-        send_eod_summary(results)
+        pending.append(format_eod_summary(results))
+
+    pending = [m for m in pending if m]
+    if pending:
+        try:
+            posts = send_telegram_messages(pending)
+            print(f"✅ Queued {posts} Telegram post(s) for {len(pending)} update(s).")
+        except Exception as e:
+            print(f"⚠️ Telegram send failed: {e}")
 
     print(f"[{now_ist().isoformat()}] ✅ Signals found: {len(signals)}")
     return signals
@@ -229,8 +395,8 @@ if __name__ == "__main__":
     parser.add_argument("--dry-run", action="store_true", help="Skip Telegram messages")
     args = parser.parse_args()
 
-    now = datetime.now(pytz.timezone("Asia/Kolkata")).time()
-    if time(9, 15) <= now <= time(15, 30):
+    now = ist_now().time()
+    if MARKET_OPEN <= now <= MARKET_CLOSE:
         print("📈 Market open — running trading pipeline...")
         run(dry_run=args.dry_run)
     else:
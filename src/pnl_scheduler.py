@@ -1,14 +1,28 @@
 import schedule
 import time
-import subprocess
+from datetime import time as dtime
+
+from src.helpers import now_ist
+from src.pnl_tracker import run as track_run
+
+# Stop a little after the close so the last tick can post the EOD summary
+SHUTDOWN_AT = dtime(15, 35)
 
 def run_tracker():
-    subprocess.run(["python", "src/pnl_tracker.py"])
+    # Same process every tick: imports, Sheets client and caches stay warm
+    try:
+        track_run()
+    except Exception as e:
+        print(f"⚠️ PnL tracker run failed: {e}")
 
 schedule.every(5).minutes.do(run_tracker)
 
-print("📈 Running pnl_tracker every 5 minutes until 3:30 PM...")
+print("📈 Running pnl_tracker every 5 minutes until 3:35 PM...")
 
-while True:
+while now_ist().time() < SHUTDOWN_AT:
     schedule.run_pending()
-    time.sleep(60)
+    # Sleep until the next job is due instead of polling on a fixed 60s grid
+    idle = schedule.idle_seconds()
+    time.sleep(min(max(idle if idle is not None else 60, 1), 60))
+
+print("🛑 Market closed — PnL scheduler stopped.")
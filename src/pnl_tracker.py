@@ -1,35 +1,26 @@
 import os
 import json
+import numpy as np
 import pandas as pd
-import pytz
-from datetime import datetime, time
-from dotenv import load_dotenv
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
-import yfinance as yf
+from datetime import time
+from src.helpers import load_env, now_ist
+from src.fetch_live_data import fetch_live_prices_bulk
+from src.indicators_nb import classify_trades_nb
+from src.utils.sheets import get_sheet
 
 # === Load environment ===
-load_dotenv()
+load_env()
 
 SHEET_ID = os.getenv("SHEET_ID")
 SHEET_NAME = os.getenv("SHEET_NAME")
-SERVICE_ACCOUNT_FILE = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
 
-# === Google Sheets Auth ===
-SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
-sheet = None
-
-if not SERVICE_ACCOUNT_FILE or not os.path.exists(SERVICE_ACCOUNT_FILE):
-    print("⚠️ Service account file not found — Google Sheet update skipped.")
-else:
-    creds = Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-    service = build("sheets", "v4", credentials=creds)
-    sheet = service.spreadsheets()
-    print("✅ Google Sheets API authenticated successfully.")
+# EOD summary goes out on the first run at or after the close (IST)
+MARKET_CLOSE = time(15, 30)
 
 
 # === Fetch data safely ===
 def fetch_signals():
+    sheet = get_sheet()
     if sheet is None:
         print("⚠️ Google Sheet client not initialized.")
         return pd.DataFrame()
@@ -55,94 +46,73 @@ def fetch_signals():
     extra_cols = ["LivePrice", "Result", "PnL%", "Status"]
     all_cols = base_cols + extra_cols
 
-    # Pad rows
-    for row in values:
-        while len(row) < len(all_cols):
-            row.append("")
-
-    df = pd.DataFrame(values, columns=all_cols)
-    for col in ["Entry", "Target", "Stoploss", "Confidence", "LivePrice"]:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
+    # Short rows (trailing blanks are dropped by the API) padded by reindex
+    df = pd.DataFrame(values).reindex(columns=range(len(all_cols))).fillna("")
+    df.columns = all_cols
+    # Raw J:L cells as read, so update_sheet only rewrites rows that changed
+    df.attrs["sheet_pnl"] = df[extra_cols[:3]].values.tolist()
+    num_cols = ["Entry", "Target", "Stoploss", "Confidence", "LivePrice"]
+    df[num_cols] = df[num_cols].apply(pd.to_numeric, errors="coerce")
 
     return df
 
 
 # === Fetch latest live price ===
-def fetch_live_price(symbol):
-    try:
-        data = yf.download(symbol, period="1d", interval="1m", progress=False)
-        if data.empty:
-            print(f"⚠️ No data for {symbol}")
-            return None
-        return round(data["Close"].iloc[-1], 2)
-    except Exception as e:
-        print(f"❌ Error fetching {symbol}: {e}")
+def fetch_live_price(symbol, refresh=False):
+    price = fetch_live_prices_bulk([symbol], refresh=refresh).get(symbol)
+    if price is None:
+        print(f"⚠️ No data for {symbol}")
         return None
+    return round(price, 2)
+
+
+# === Trade classification ===
+RESULT_LABELS = np.array(["Open", "Target Hit", "SL Hit"], dtype=object)
+
+
+def classify_trades(lp, entry, target, stop, side):
+    """
+    (Result, PnL%) arrays for a set of trades, computed by the compiled
+    classify_trades_nb loop. `side` holds upper-case BUY/SELL; rows without a
+    live price (NaN or 0) or with any other side stay Open at 0%.
+    """
+    n = len(lp)
+    side_code = np.where(side == "BUY", 1, np.where(side == "SELL", -1, 0)).astype(np.int8)
+    code = np.empty(n, dtype=np.int8)
+    pnl = np.empty(n, dtype=np.float64)
+    classify_trades_nb(
+        np.ascontiguousarray(lp, dtype=np.float64),
+        np.ascontiguousarray(entry, dtype=np.float64),
+        np.ascontiguousarray(target, dtype=np.float64),
+        np.ascontiguousarray(stop, dtype=np.float64),
+        side_code, code, pnl,
+    )
+    return RESULT_LABELS[code], np.round(pnl, 2)
 
 
 # === Evaluate live trade performance ===
 def evaluate(df):
     print("📊 Evaluating live PnL for trades...")
 
-    live_prices = []
-    for symbol in df["Stock"]:
-        try:
-            data = yf.download(symbol, period="1d", interval="1m", progress=False)
-            if data.empty:
-                print(f"⚠️ No data for {symbol}, setting LivePrice = NaN")
-                live_prices.append(float("nan"))
-                continue
-
-            # Extract last closing price safely
-            last_price = data["Close"].iloc[-1]
-            if isinstance(last_price, (pd.Series, list)):
-                last_price = float(last_price[-1])
-            live_prices.append(round(float(last_price), 2))
-
-        except Exception as e:
-            print(f"❌ Error fetching {symbol}: {e}")
-            live_prices.append(float("nan"))
-
-    # ✅ Ensure it's a flat numeric list
-    if len(live_prices) != len(df):
-        print(f"⚠️ Mismatch in data lengths ({len(live_prices)} vs {len(df)}). Padding with NaN.")
-        while len(live_prices) < len(df):
-            live_prices.append(float("nan"))
-
-    df["LivePrice"] = pd.to_numeric(pd.Series(live_prices), errors="coerce")
-
-    # === Compute PnL & Status ===
-    def compute(row):
-        try:
-            lp = float(row["LivePrice"])
-            entry = float(row["Entry"])
-            target = float(row["Target"])
-            stop = float(row["Stoploss"])
-            side = str(row["Side"]).upper()
-        except Exception:
-            return "Open", 0.0
-
-        if pd.isna(lp) or lp == 0:
-            return "Open", 0.0
-
-        if side == "BUY":
-            if lp >= target:
-                return "Target Hit", ((target - entry) / entry) * 100
-            elif lp <= stop:
-                return "SL Hit", ((stop - entry) / entry) * 100
-            else:
-                return "Open", ((lp - entry) / entry) * 100
-        elif side == "SELL":
-            if lp <= target:
-                return "Target Hit", ((entry - target) / entry) * 100
-            elif lp >= stop:
-                return "SL Hit", ((entry - stop) / entry) * 100
-            else:
-                return "Open", ((entry - lp) / entry) * 100
-        return "Open", 0.0
-
-    df[["Result", "PnL%"]] = df.apply(lambda x: pd.Series(compute(x)), axis=1)
-    df["PnL%"] = df["PnL%"].round(2)
+    # One spark GET per 20 symbols instead of one download per row
+    symbols = df["Stock"].dropna().unique().tolist()
+    prices = fetch_live_prices_bulk(symbols)
+    for symbol in symbols:
+        if symbol not in prices:
+            print(f"⚠️ No data for {symbol}, setting LivePrice = NaN")
+
+    df["LivePrice"] = pd.to_numeric(df["Stock"].map(prices), errors="coerce").round(2)
+
+    # === Compute PnL & Status (vectorized) ===
+    result, pnl = classify_trades(
+        df["LivePrice"].to_numpy(dtype=float),
+        pd.to_numeric(df["Entry"], errors="coerce").to_numpy(dtype=float),
+        pd.to_numeric(df["Target"], errors="coerce").to_numpy(dtype=float),
+        pd.to_numeric(df["Stoploss"], errors="coerce").to_numpy(dtype=float),
+        df["Side"].astype(str).str.upper().to_numpy(),
+    )
+    df["Result"] = result
+    df["PnL%"] = pnl
 
     print("✅ PnL evaluation completed successfully.")
     return df
@@ -151,31 +121,56 @@ def evaluate(df):
 
 # === Update back to Google Sheet ===
 def update_sheet(df):
+    sheet = get_sheet()
     if sheet is None:
         print("⚠️ Google Sheet client not available.")
         return
 
     try:
         rows = df[["LivePrice", "Result", "PnL%"]].fillna("").astype(str).values.tolist()
-        sheet.values().update(
+        data = _changed_ranges(rows, df.attrs.get("sheet_pnl"))
+        if not data:
+            print("✅ Google Sheet PnL data already up to date.")
+            return
+        # batchUpdate: every changed block goes out in one request (and quota unit)
+        sheet.values().batchUpdate(
             spreadsheetId=SHEET_ID,
-            range=f"{SHEET_NAME}!J2:L{len(rows)+1}",
-            valueInputOption="RAW",
-            body={"values": rows}
+            body={"valueInputOption": "RAW", "data": data}
         ).execute()
-        print(f"✅ Updated {len(rows)} rows in Google Sheet with PnL data.")
+        changed = sum(len(d["values"]) for d in data)
+        print(f"✅ Updated {changed} of {len(rows)} rows in Google Sheet with PnL data.")
     except Exception as e:
         print(f"❌ Error updating Google Sheet: {e}")
 
 
-# === Telegram summary ===
-def send_summary(df):
-    from src.utils.telegram_alert import send_telegram_message
+def _changed_ranges(rows, previous):
+    """
+    batchUpdate `data` entries covering only the J:L rows that differ from what
+    was read (all rows when the previous values are unknown). Consecutive
+    changed rows are merged into one range.
+    """
+    if previous is None or len(previous) != len(rows):
+        return [{"range": f"{SHEET_NAME}!J2:L{len(rows)+1}", "values": rows}]
+
+    data, start = [], None
+    for i, (new, old) in enumerate(zip(rows + [None], previous + [None])):
+        if new is not None and new != old:
+            if start is None:
+                start = i
+            continue
+        if start is not None:
+            data.append({"range": f"{SHEET_NAME}!J{start+2}:L{i+1}", "values": rows[start:i]})
+            start = None
+    return data
 
+
+# === Telegram summary ===
+def format_summary(df):
     total = len(df)
-    hits = len(df[df["Result"] == "Target Hit"])
-    losses = len(df[df["Result"] == "SL Hit"])
-    open_trades = len(df[df["Result"] == "Open"])
+    counts = df["Result"].value_counts()
+    hits = int(counts.get("Target Hit", 0))
+    losses = int(counts.get("SL Hit", 0))
+    open_trades = int(counts.get("Open", 0))
     winrate = round((hits / (hits + losses)) * 100, 2) if (hits + losses) > 0 else 0
 
     msg = (
@@ -187,25 +182,41 @@ def send_summary(df):
         f"📈 *Total Trades:* {total}\n\n"
         f"🧠 *Performance looks great! Keep monitoring tomorrow.*"
     )
-    send_telegram_message(msg)
+    return msg
+
+
+def send_summary(df):
+    from src.utils.telegram_alert import send_telegram_message
+
+    send_telegram_message(format_summary(df))
     print("✅ Telegram summary sent successfully.")
 
 
 # === Main runner ===
-def run():
+def run(send=True):
+    """
+    Evaluate and write back every trade in the sheet. After the close the EOD
+    summary text is returned, and sent to Telegram unless `send` is False
+    (callers batching their own Telegram post append it instead).
+    """
     df = fetch_signals()
     if df.empty:
         print("⚠️ No trades found in Google Sheet.")
-        return
+        return None
 
     df = evaluate(df)
     update_sheet(df)
 
-    now = datetime.now(pytz.timezone("Asia/Kolkata")).time()
-    if now >= time(15, 30):
-        send_summary(df)
-    else:
-        print("⏳ Market open — skipping EOD summary for now.")
+    if now_ist().time() >= MARKET_CLOSE:
+        msg = format_summary(df)
+        if send:
+            from src.utils.telegram_alert import send_telegram_message
+
+            send_telegram_message(msg)
+            print("✅ Telegram summary sent successfully.")
+        return msg
+    print("⏳ Market open — skipping EOD summary for now.")
+    return None
 
 
 if __name__ == "__main__":
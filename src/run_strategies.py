@@ -1,22 +1,39 @@
 # src/run_strategies.py
 import importlib
 import os
+from concurrent.futures import ThreadPoolExecutor
 from glob import glob
 
 STRAT_PATH = "strategies"
 
+# (((file, mtime), ...), [(name, module), ...]) from the last load
+_STRAT_CACHE = None
+
 def load_strategy_modules():
-    """Load all strategy modules dynamically."""
+    """
+    Load all strategy modules dynamically. The result is reused until a strategy
+    file is added, removed or modified; modified files are reloaded.
+    """
+    global _STRAT_CACHE
+    files = [
+        f for f in glob(os.path.join(STRAT_PATH, "*.py"))
+        if not os.path.basename(f).startswith("_")
+    ]
+    signature = tuple((f, os.path.getmtime(f)) for f in files)
+    if _STRAT_CACHE is not None and _STRAT_CACHE[0] == signature:
+        return list(_STRAT_CACHE[1])
+
+    seen = dict(_STRAT_CACHE[0]) if _STRAT_CACHE is not None else {}
     mods = []
-    files = glob(os.path.join(STRAT_PATH, "*.py"))
-    for f in files:
+    for f, mtime in signature:
         name = os.path.splitext(os.path.basename(f))[0]
-        if name.startswith("_"):
-            continue
         mod = importlib.import_module(f"{STRAT_PATH}.{name}")
+        if f in seen and seen[f] != mtime:
+            mod = importlib.reload(mod)
         if hasattr(mod, "generate_signal"):
             mods.append((name, mod))
-    return mods
+    _STRAT_CACHE = (signature, mods)
+    return list(mods)
 
 def get_required_indicators(strategies):
     """Collect unique indicators required by all loaded strategies."""
@@ -26,10 +43,16 @@ def get_required_indicators(strategies):
             indicators.update(mod.REQUIRED_INDICATORS)
     return list(indicators)
 
-def evaluate_for_ticker(ticker, multi_df, confidence_threshold=0.6):
-    """Run all strategies for a single ticker and return valid signals."""
+def evaluate_for_ticker(ticker, multi_df, confidence_threshold=0.6, strategies=None):
+    """
+    Run all strategies for a single ticker and return valid signals.
+    Pass `strategies` (from load_strategy_modules) when evaluating many tickers
+    so the strategy directory is checked once rather than per ticker.
+    """
+    if strategies is None:
+        strategies = load_strategy_modules()
     signals = []
-    for name, mod in load_strategy_modules():
+    for name, mod in strategies:
         try:
             sig = mod.generate_signal(ticker, multi_df)
             if sig:
@@ -39,6 +62,23 @@ def evaluate_for_ticker(ticker, multi_df, confidence_threshold=0.6):
         except Exception:
             continue
     return signals
+
+def evaluate_all(tickers, data, confidence_threshold=0.6, max_workers=8):
+    """
+    Run all strategies for every ticker on a thread pool.
+    `data` maps ticker -> {timeframe: DataFrame} (e.g. fetch_all_timeframes output).
+    Strategies are loaded once up front so workers never race on importlib.
+    Returns the flattened signals in ticker order.
+    """
+    strategies = load_strategy_modules()
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        results = ex.map(
+            lambda t: evaluate_for_ticker(t, data.get(t, {}), confidence_threshold, strategies),
+            tickers,
+        )
+        return [sig for sigs in results for sig in sigs]
+
+
 if __name__ == "__main__":
     mods = load_strategy_modules()
     print("Loaded strategies:", [name for name, _ in mods])
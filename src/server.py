@@ -1,19 +1,63 @@
 # src/server.py
-from flask import Flask
 import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import Flask
 from src.pipeline import run
 
 app = Flask(__name__)
 
+# Pipeline runs go to a worker process so they don't fight the web thread for
+# the GIL; single-flight, so one worker is enough
+EXEC = ProcessPoolExecutor(max_workers=1)
+MAX_JOBS = 50  # finished jobs kept for /status
+JOBS = OrderedDict()  # job id -> Future
+_current_job = None
+_jobs_lock = threading.Lock()
+
+def _submit_run():
+    """Submit a pipeline run, replacing the executor if its worker has died."""
+    global EXEC
+    try:
+        return EXEC.submit(run, dry_run=False)
+    except BrokenProcessPool:
+        print("⚠️ Pipeline worker died, starting a new one")
+        EXEC.shutdown(wait=False)
+        EXEC = ProcessPoolExecutor(max_workers=1)
+        return EXEC.submit(run, dry_run=False)
+
 @app.route('/')
 def home():
     return "✅ Trading automation is alive!", 200
 
 @app.route('/run')
 def trigger_run():
-    # Run the trading job in background
-    threading.Thread(target=run, kwargs={"dry_run": False}).start()
-    return "🚀 Trading job started successfully", 200
+    global _current_job
+    with _jobs_lock:
+        # Single-flight: a trigger while a run is in progress joins that run
+        if _current_job is not None and not JOBS[_current_job].done():
+            return f"⏳ Trading job {_current_job} already running", 202
+
+        job_id = uuid.uuid4().hex[:12]
+        JOBS[job_id] = _submit_run()
+        _current_job = job_id
+        while len(JOBS) > MAX_JOBS:
+            JOBS.popitem(last=False)
+    return f"🚀 Trading job {job_id} started successfully", 200
+
+@app.route('/status/<job_id>')
+def job_status(job_id):
+    fut = JOBS.get(job_id)
+    if fut is None:
+        return {"job_id": job_id, "status": "unknown"}, 404
+    if not fut.done():
+        return {"job_id": job_id, "status": "running"}, 200
+    err = fut.exception()
+    if err is not None:
+        return {"job_id": job_id, "status": "failed", "error": str(err)}, 200
+    return {"job_id": job_id, "status": "done", "signals": len(fut.result() or [])}, 200
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=10000)
@@ -1,9 +1,12 @@
 import os
 import json
+import time
 import random
+import numpy as np
 import pandas as pd
 import yfinance as yf
 from datetime import datetime, timedelta
+from src.helpers import load_json, save_json, write_atomic
 
 # Paths setup
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -14,6 +17,11 @@ CORE_CONFIG = os.path.join(CONFIG_DIR, "core_stocks.json")
 POOL_CONFIG = os.path.join(CONFIG_DIR, "pool_stocks.json")
 FINAL_WATCHLIST = os.path.join(OUTPUT_DIR, "final_watchlist.json")
 
+# Daily bars barely move within a session, so repeated scans reuse the last
+# download for a while instead of hitting Yahoo again
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
+DAILY_CACHE_TTL = 900  # seconds
+
 # Default fallback if no pool config is found
 DEFAULT_POOL = [
     "RELIANCE.NS", "INFY.NS", "TCS.NS", "HDFCBANK.NS", "ICICIBANK.NS",
@@ -29,10 +37,9 @@ DEFAULT_POOL = [
 def load_core():
     """Load core_stocks.json (always include these stocks)."""
     try:
-        with open(CORE_CONFIG, "r") as f:
-            data = json.load(f)
-            if isinstance(data, list):
-                return data
+        data = load_json(CORE_CONFIG)
+        if isinstance(data, list):
+            return data
     except Exception:
         pass
     return []
@@ -41,10 +48,9 @@ def load_core():
 def load_pool():
     """Load pool_stocks.json if exists, else fallback to DEFAULT_POOL."""
     try:
-        with open(POOL_CONFIG, "r") as f:
-            data = json.load(f)
-            if isinstance(data, list) and len(data) > 0:
-                return data
+        data = load_json(POOL_CONFIG)
+        if isinstance(data, list) and len(data) > 0:
+            return data
     except Exception:
         pass
     return DEFAULT_POOL
@@ -71,6 +77,86 @@ def is_close_to_52w_high_low(df, pct_threshold=3.0):
         return False
 
 
+def near_52w_high_low(closes, pct_threshold=3.0):
+    """
+    Vectorized is_close_to_52w_high_low for many tickers at once.
+    `closes` is a wide frame with one close column per ticker; returns a bool
+    Series indexed by ticker.
+    """
+    window = closes.tail(252)
+    high52 = window.max()
+    low52 = window.min()
+    last = window.ffill().iloc[-1]
+    pct_high = (high52 - last) / high52 * 100
+    pct_low = (last - low52) / low52 * 100
+    return ((pct_high <= pct_threshold) | (pct_low <= pct_threshold)).fillna(False)
+
+
+def download_daily(pool, period="60d", batch_size=20):
+    """
+    Daily OHLCV for every ticker in `pool`, one multi-ticker download per
+    `batch_size` symbols (Yahoo's per-request limit) instead of one per ticker.
+    Tickers missing from a batch (absent, or present with no data) are
+    retried individually.
+    Returns {ticker: DataFrame} with flat OHLCV columns.
+    """
+    frames = {}
+    for i in range(0, len(pool), batch_size):
+        chunk = pool[i:i + batch_size]
+        try:
+            data = yf.download(" ".join(chunk), period=period, interval="1d",
+                               group_by="ticker", threads=True, progress=False)
+        except Exception:
+            data = None
+        for t in chunk:
+            try:
+                if data is None or data.empty:
+                    raise KeyError(t)
+                df = data[t] if isinstance(data.columns, pd.MultiIndex) else data
+                # A symbol that failed inside the batch comes back as an all-NaN block
+                if df.dropna(how="all").empty:
+                    raise KeyError(t)
+            except KeyError:
+                try:
+                    df = yf.download(t, period=period, interval="1d", progress=False, threads=False)
+                    if isinstance(df.columns, pd.MultiIndex):
+                        df = df.xs(t, axis=1, level=-1)
+                except Exception:
+                    continue
+            if df is not None and not df.empty:
+                frames[t] = df
+    return frames
+
+
+def _daily_cache_path(period):
+    return os.path.join(CACHE_DIR, f"daily_scan_{period}.pkl")
+
+
+def download_daily_cached(pool, period="60d"):
+    """
+    download_daily with a short-lived disk cache: a scan of the same pool
+    within DAILY_CACHE_TTL seconds is served from the last download.
+    """
+    path = _daily_cache_path(period)
+    try:
+        cached = pd.read_pickle(path)
+        if (cached["pool"] == sorted(pool)
+                and time.time() - cached["cached_at"] <= DAILY_CACHE_TTL):
+            return cached["frames"]
+    except Exception:
+        pass
+
+    frames = download_daily(pool, period=period)
+    if frames:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        payload = {"pool": sorted(pool), "cached_at": time.time(), "frames": frames}
+        try:
+            write_atomic(path, lambda tmp: pd.to_pickle(payload, tmp))
+        except Exception as e:
+            print(f"⚠️ Could not cache daily scan: {e}")
+    return frames
+
+
 def get_dynamic_tickers(pool_tickers=None, top_n=8,
                         vol_multiplier=1.3, price_move_pct=1.5,
                         use_52w=True, pct_52w=3.0):
@@ -81,47 +167,44 @@ def get_dynamic_tickers(pool_tickers=None, top_n=8,
       - 52-week proximity
     Returns top_n ranked by score.
     """
-    pool = pool_tickers or load_pool()
-    scored = []
+    # Pools are hand-edited JSON; a repeated symbol would be downloaded twice
+    pool = list(dict.fromkeys(pool_tickers or load_pool()))
     period_str = "60d"
 
-    for t in pool:
-        try:
-            df = yf.download(t, period=period_str, interval="1d", progress=False, threads=False)
-            if df is None or df.empty:
-                continue
-
-            if "Volume" not in df.columns or "Close" not in df.columns:
-                continue
-
-            df = df.dropna(subset=["Close", "Volume"])
-            if df.shape[0] < 10:
-                continue
+    frames = download_daily_cached(pool, period=period_str)
 
-            avg_vol = df["Volume"].tail(20).mean()
-            latest = df.iloc[-1]
-            prev_close = df["Close"].iloc[-2] if df.shape[0] > 1 else latest["Close"]
-
-            vol_ratio = latest["Volume"] / (avg_vol + 1e-9)
-            move_pct = ((latest["Close"] - prev_close) / prev_close) * 100 if prev_close else 0
-
-            score = 0
-            if vol_ratio >= vol_multiplier:
-                score += vol_ratio
-            if abs(move_pct) >= price_move_pct:
-                score += abs(move_pct) / price_move_pct
-            if use_52w and is_close_to_52w_high_low(df, pct_threshold=pct_52w):
-                score += 0.8
-
-            if score > 0:
-                scored.append({"ticker": t, "score": score})
-
-        except Exception:
+    # Right-align each ticker's valid rows (index -n..-1) so every column's last
+    # row is its latest bar and tail(k) means that ticker's last k bars
+    closes, volumes = {}, {}
+    for t, df in frames.items():
+        if "Volume" not in df.columns or "Close" not in df.columns:
             continue
-
-    # Sort and pick top N
-    scored.sort(key=lambda x: x["score"], reverse=True)
-    dynamic = [s["ticker"] for s in scored[:top_n]]
+        df = df.dropna(subset=["Close", "Volume"])
+        if df.shape[0] < 10:
+            continue
+        idx = np.arange(-len(df), 0)
+        closes[t] = pd.Series(df["Close"].to_numpy(dtype=float), index=idx)
+        volumes[t] = pd.Series(df["Volume"].to_numpy(dtype=float), index=idx)
+
+    dynamic = []
+    if closes:
+        close_df = pd.DataFrame(closes)
+        vol_df = pd.DataFrame(volumes)
+
+        avg_vol = vol_df.tail(20).mean()
+        vol_ratio = vol_df.iloc[-1] / (avg_vol + 1e-9)
+        last, prev = close_df.iloc[-1], close_df.iloc[-2]
+        move_pct = ((last - prev) / prev * 100).where(prev != 0, 0.0).abs()
+
+        score = (
+            vol_ratio.where(vol_ratio >= vol_multiplier, 0.0)
+            + (move_pct / price_move_pct).where(move_pct >= price_move_pct, 0.0)
+        )
+        if use_52w:
+            score += near_52w_high_low(close_df, pct_threshold=pct_52w).astype(float) * 0.8
+
+        # Pick top N
+        dynamic = score[score > 0].nlargest(top_n).index.tolist()
 
     # Fallback if empty
     if not dynamic:
@@ -143,14 +226,10 @@ def build_watchlist(pool_tickers=None, top_n=8, **kwargs):
     core = load_core()
     dynamic = get_dynamic_tickers(pool_tickers=pool_tickers, top_n=top_n, **kwargs)
 
-    final = []
-    for t in core + dynamic:
-        if t not in final:
-            final.append(t)
+    # Ordered dedup: core first, then dynamic picks not already in core
+    final = list(dict.fromkeys(core + dynamic))
 
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    with open(FINAL_WATCHLIST, "w") as f:
-        json.dump(final, f, indent=2)
+    save_json(final, FINAL_WATCHLIST)
 
     print(f"✅ Final Watchlist Built ({len(final)} stocks):")
     print(json.dumps(final, indent=2))
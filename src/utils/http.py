@@ -0,0 +1,42 @@
+# src/utils/http.py
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def _build_session(retry):
+    """
+    requests.Session with a connection pool and the given retry policy.
+    The last response is returned rather than raised (raise_on_status=False)
+    so callers keep their own status-code handling.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# Shared by every outbound API call so repeated requests reuse the TCP+TLS
+# connection. Idempotent methods (urllib3's default set, no POST) are retried
+# on connection errors, rate limiting (429, honouring Retry-After) and
+# transient 5xx responses.
+SESSION = _build_session(Retry(
+    total=3,
+    backoff_factor=0.3,
+    status_forcelist=[429, 500, 502, 503, 504],
+    raise_on_status=False,
+))
+
+# For non-idempotent posts (Telegram sendMessage, the Sheets webhook): a read
+# timeout or 5xx may come after the server already acted, so only requests
+# that never reached it (connection errors) or were rejected outright (429)
+# are sent again.
+POST_SESSION = _build_session(Retry(
+    total=3,
+    read=0,
+    backoff_factor=0.3,
+    status_forcelist=[429],
+    allowed_methods=frozenset({"POST"}),
+    raise_on_status=False,
+))
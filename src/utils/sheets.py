@@ -0,0 +1,29 @@
+# src/utils/sheets.py
+import os
+from functools import lru_cache
+from src.helpers import load_env
+
+load_env()
+SERVICE_ACCOUNT_FILE = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+
+
+@lru_cache(maxsize=None)
+def get_sheet():
+    """
+    Spreadsheets resource shared by the whole process (None without a service account).
+    Built on first use; the discovery document ships with the client library, so
+    build() makes no network call, and the one authorized transport keeps its
+    TLS connection alive across every get/append/batchUpdate.
+    """
+    if not SERVICE_ACCOUNT_FILE or not os.path.exists(SERVICE_ACCOUNT_FILE):
+        print("⚠️ Service account file not found — Google Sheet update skipped.")
+        return None
+
+    from google.oauth2.service_account import Credentials
+    from googleapiclient.discovery import build
+
+    creds = Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
+    service = build("sheets", "v4", credentials=creds, cache_discovery=False, static_discovery=True)
+    print("✅ Google Sheets API authenticated successfully.")
+    return service.spreadsheets()
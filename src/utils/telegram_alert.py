@@ -1,24 +1,40 @@
 import os
-import json
 import time
+import queue
+import atexit
+import threading
 import requests
-from dotenv import load_dotenv
+from src.helpers import load_env, load_json, save_json
+from src.utils.http import POST_SESSION
 
-load_dotenv()
+load_env()
 
 BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "").strip().replace('"', '')
 CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "").strip().replace('"', '')
+_URL = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
 HEARTBEAT_FILE = "output/last_heartbeat.json"
 
-def send_telegram_message(message: str):
-    """
-    Sends a Telegram message to the configured chat with Markdown enabled.
-    """
-    if not BOT_TOKEN or not CHAT_ID:
-        print("⚠️ Telegram not configured properly (missing BOT_TOKEN or CHAT_ID).")
-        return
+# Token bucket keeping bursts under Telegram's ~30 messages/s per bot
+MAX_RPS = 25
+_bucket_lock = threading.Lock()
+_tokens = float(MAX_RPS)
+_last_refill = time.monotonic()
 
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
+
+def _take_token():
+    """Block until a send slot is free."""
+    global _tokens, _last_refill
+    with _bucket_lock:
+        now = time.monotonic()
+        _tokens = min(MAX_RPS, _tokens + (now - _last_refill) * MAX_RPS)
+        _last_refill = now
+        if _tokens < 1:
+            time.sleep((1 - _tokens) / MAX_RPS)
+            _tokens = 1.0
+            _last_refill = time.monotonic()
+        _tokens -= 1
+
+def _post(message):
     payload = {
         "chat_id": CHAT_ID,
         "text": message,
@@ -27,7 +43,8 @@ def send_telegram_message(message: str):
     }
 
     try:
-        response = requests.post(url, json=payload, timeout=10)
+        _take_token()
+        response = POST_SESSION.post(_URL, json=payload, timeout=10)
         if response.status_code == 200:
             print(f"✅ Telegram message sent successfully to {CHAT_ID}")
         else:
@@ -36,32 +53,141 @@ def send_telegram_message(message: str):
         print(f"⚠️ Telegram send failed due to network error: {e}")
 
 
-def can_send_heartbeat(interval_minutes=60):
+# === Background sender ===
+# Callers only enqueue; one daemon thread per process posts in order, so a slow
+# or failing Telegram call never stalls the trading loop. Bounded queue: when
+# it is full, new messages are dropped rather than blocking.
+SEND_QUEUE_MAX = 1000
+FLUSH_TIMEOUT = 30  # seconds to drain pending messages at interpreter exit
+_queue = queue.Queue(maxsize=SEND_QUEUE_MAX)
+_worker = None
+_worker_pid = None
+_worker_lock = threading.Lock()
+
+
+def _send_loop():
+    while True:
+        message = _queue.get()
+        try:
+            _post(message)
+        except Exception as e:
+            print(f"⚠️ Telegram send failed: {e}")
+        finally:
+            _queue.task_done()
+
+
+def _ensure_worker():
+    """Start the sender thread (again after a fork, where threads don't survive)."""
+    global _worker, _worker_pid
+    with _worker_lock:
+        if _worker is None or _worker_pid != os.getpid() or not _worker.is_alive():
+            _worker = threading.Thread(target=_send_loop, name="telegram-sender", daemon=True)
+            _worker.start()
+            _worker_pid = os.getpid()
+
+
+def flush_telegram(timeout=FLUSH_TIMEOUT):
+    """Wait up to `timeout` seconds for queued messages to be sent."""
+    deadline = time.monotonic() + timeout
+    while _queue.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+# Short-lived runs (cron, CLI) exit right after queueing their alerts
+atexit.register(flush_telegram)
+
+
+def send_telegram_message(message: str):
     """
-    Checks if at least `interval_minutes` have passed since the last heartbeat message.
+    Queues a Telegram message to the configured chat with Markdown enabled.
+    Returns immediately; the post happens on the background sender thread.
     """
-    if not os.path.exists(HEARTBEAT_FILE):
-        return True
+    if not BOT_TOKEN or not CHAT_ID:
+        print("⚠️ Telegram not configured properly (missing BOT_TOKEN or CHAT_ID).")
+        return
 
+    _ensure_worker()
     try:
-        with open(HEARTBEAT_FILE, "r") as f:
-            data = json.load(f)
-        last_time = data.get("timestamp", 0)
-        if time.time() - last_time >= interval_minutes * 60:
-            return True
-    except Exception:
-        return True
+        _queue.put_nowait(message)
+    except queue.Full:
+        print("⚠️ Telegram send queue full, dropping message.")
+
+
+TELEGRAM_MAX_LEN = 4096
+MESSAGE_SEP = "\n\n━━━\n\n"
+
+
+def _pack_messages(messages):
+    """
+    Join messages into as few posts of at most TELEGRAM_MAX_LEN chars as possible,
+    splitting only between messages (a single oversized message is cut into pieces).
+    """
+    posts, cur = [], ""
+    for m in messages:
+        if not m:
+            continue
+        if len(m) > TELEGRAM_MAX_LEN:
+            if cur:
+                posts.append(cur)
+                cur = ""
+            posts.extend(m[i:i + TELEGRAM_MAX_LEN] for i in range(0, len(m), TELEGRAM_MAX_LEN))
+            continue
+        if cur and len(cur) + len(MESSAGE_SEP) + len(m) > TELEGRAM_MAX_LEN:
+            posts.append(cur)
+            cur = ""
+        cur = f"{cur}{MESSAGE_SEP}{m}" if cur else m
+    if cur:
+        posts.append(cur)
+    return posts
+
+
+def send_telegram_messages(messages):
+    """
+    Send several messages as the fewest possible Telegram posts; returns the
+    number of posts queued.
+    """
+    posts = _pack_messages(messages)
+    for post in posts:
+        send_telegram_message(post)
+    return len(posts)
 
-    return False
+
+# Last heartbeat (epoch seconds), kept in memory. The file is read once per
+# process and written back at exit, so separate cron runs still share it.
+# Only a process that recorded a heartbeat writes it back, so one that merely
+# checked never overwrites a newer timestamp from another process.
+_last_heartbeat = None
+_heartbeat_dirty = False
+
+
+def _persist_heartbeat():
+    if _heartbeat_dirty:
+        save_json({"timestamp": _last_heartbeat}, HEARTBEAT_FILE)
+
+
+def can_send_heartbeat(interval_minutes=60):
+    """
+    Checks if at least `interval_minutes` have passed since the last heartbeat message.
+    """
+    global _last_heartbeat
+    if _last_heartbeat is None:
+        try:
+            _last_heartbeat = float(load_json(HEARTBEAT_FILE).get("timestamp", 0))
+        except Exception:
+            _last_heartbeat = 0.0
+    return time.time() - _last_heartbeat >= interval_minutes * 60
 
 
 def update_heartbeat():
     """
-    Updates the heartbeat timestamp file.
+    Records a heartbeat now; persisted to the heartbeat file at exit.
     """
-    os.makedirs(os.path.dirname(HEARTBEAT_FILE), exist_ok=True)
-    with open(HEARTBEAT_FILE, "w") as f:
-        json.dump({"timestamp": time.time()}, f)
+    global _last_heartbeat, _heartbeat_dirty
+    _last_heartbeat = time.time()
+    _heartbeat_dirty = True
+
+
+atexit.register(_persist_heartbeat)
 
 
 def send_to_google_sheets(signal_list):
@@ -73,7 +199,7 @@ def send_to_google_sheets(signal_list):
         print("⚠️ Google Sheet webhook not configured.")
         return
     try:
-        resp = requests.post(SHEET_WEBHOOK, json=signal_list, timeout=5)
+        resp = POST_SESSION.post(SHEET_WEBHOOK, json=signal_list, timeout=5)
         if resp.status_code == 200:
             print("✅ Sent signals to Google Sheet successfully.")
         else:
@@ -0,0 +1,104 @@
+# strategies/_nb_kernels.py
+import numpy as np
+from numba import njit, types
+
+SIDE_NONE, SIDE_BUY, SIDE_SELL = 0, 1, 2
+
+# Explicit signatures compile at import (or load from the on-disk cache)
+# instead of on the first live call. Rows of strategies._utils.ohlc_soa are
+# read-only float32; writable arrays match the read-only type too.
+F4_RO = types.Array(types.float32, 1, "C", readonly=True)
+F8 = types.float64[::1]
+MACD_SIG = types.Tuple((types.int64, types.float64, types.float64, types.float64, types.float64))(
+    F8, F8, F8, F8, F8, F8, F8
+)
+ATR_SMA_SIG = F8(F4_RO, F4_RO, F4_RO, types.int64, F8)
+F8_RO = types.Array(types.float64, 1, "C", readonly=True)
+LAST_TWO_EMAS_SIGS = [
+    types.UniTuple(types.float64, 2)(x, types.float64, types.float64) for x in (F4_RO, F8_RO)
+]
+
+
+@njit(MACD_SIG, cache=True)
+def _macd_signal(macd, sig, hist, ema20, ema50, close, atr):
+    """
+    MACD crossover with EMA trend filter on the last bars of each array.
+    Returns (side_code, entry, stoploss, target, confidence); side_code is
+    SIDE_NONE when the last bar is not a filtered crossover.
+    Confidence is |last hist| over |mean hist| (NaNs skipped), clipped to [0.6, 1].
+    """
+    p, c = macd.shape[0] - 2, macd.shape[0] - 1
+
+    side = SIDE_NONE
+    if macd[p] < sig[p] and macd[c] > sig[c] and ema20[c] > ema50[c]:
+        side = SIDE_BUY
+    elif macd[p] > sig[p] and macd[c] < sig[c] and ema20[c] < ema50[c]:
+        side = SIDE_SELL
+    if side == SIDE_NONE:
+        return side, 0.0, 0.0, 0.0, 0.0
+
+    entry = close[c]
+    if side == SIDE_BUY:
+        stoploss = entry - atr[c]
+        target = entry + 2 * atr[c]
+    else:
+        stoploss = entry + atr[c]
+        target = entry - 2 * atr[c]
+
+    total = 0.0
+    count = 0
+    for i in range(hist.shape[0]):
+        if not np.isnan(hist[i]):
+            total += hist[i]
+            count += 1
+    mean = total / count if count > 0 else np.nan
+    strength = abs(hist[c]) / (abs(mean) + 1e-6)
+    # NaN strength falls back to the 0.6 floor
+    confidence = strength if strength > 0.6 else 0.6
+    if confidence > 1.0:
+        confidence = 1.0
+    return side, entry, stoploss, target, confidence
+
+
+@njit(ATR_SMA_SIG, cache=True)
+def atr_sma(high, low, close, length, out):
+    """
+    Simple-average ATR in one pass: true range (high - low on the first bar)
+    feeds a running window sum, so no TR array is materialized. out[i] is the
+    mean of the last min(i + 1, length) true ranges. Inputs must be NaN-free.
+    """
+    n = high.shape[0]
+    ring = np.zeros(length)
+    acc = 0.0
+    for i in range(n):
+        tr = high[i] - low[i]
+        if i > 0:
+            pc = close[i - 1]
+            up = abs(high[i] - pc)
+            down = abs(low[i] - pc)
+            if up > tr:
+                tr = up
+            if down > tr:
+                tr = down
+        k = i % length
+        acc += tr - ring[k]
+        ring[k] = tr
+        out[i] = acc / (i + 1 if i < length else length)
+    return out
+
+
+@njit(LAST_TWO_EMAS_SIGS, cache=True, nogil=True)
+def _last_two_emas(x, a1, a2):
+    """
+    Final values of two EMAs (pandas `adjust=False`) of x with smoothing
+    factors a1 and a2, in one pass and without materializing either series.
+    The update is written the way pandas evaluates it so results match exactly.
+    x may be float32 (pipeline frames); the EMAs still accumulate in float64.
+    """
+    e1 = np.float64(x[0])
+    e2 = e1
+    for i in range(1, x.shape[0]):
+        v = x[i]
+        e1 = ((1.0 - a1) * e1 + a1 * v) / ((1.0 - a1) + a1)
+        e2 = ((1.0 - a2) * e2 + a2 * v) / ((1.0 - a2) + a2)
+    return e1, e2
@@ -0,0 +1,94 @@
+# strategies/_utils.py
+import threading
+import time
+import weakref
+import numpy as np
+from collections import OrderedDict
+from datetime import datetime
+from strategies._nb_kernels import atr_sma
+
+OHLC_COLS = ["open", "high", "low", "close"]
+
+
+def rolling_atr(df, period=14):
+    """Simple-average ATR over true range (first bar: high - low) as a float array."""
+    _, high, low, close = ohlc_soa(df)
+    return atr_sma(high, low, close, period, np.empty(len(df)))
+
+
+def ensure_normalized(df):
+    """
+    Frame with lower-case columns, no rows missing an OHLC price and an `atr`
+    column. Pipeline frames are normalized at ingress and tagged with
+    attrs["_normalized"], so they are returned as is; anything else is
+    normalized once into a tagged copy. A missing atr column is filled with
+    rolling_atr, so strategies read ATR as a scalar; the caller's frame is
+    never written to (a tagged frame gets one memoized copy with the column).
+    """
+    if not df.attrs.get("_normalized"):
+        df = df.rename(columns=str.lower)
+        df = df.dropna(subset=[c for c in OHLC_COLS if c in df.columns])
+        df.attrs["_normalized"] = True
+        if "atr" not in df.columns:
+            df["atr"] = rolling_atr(df)
+        return df
+    if "atr" not in df.columns:
+        src = df
+        df = frame_memo(src, "with_atr", lambda: src.assign(atr=rolling_atr(src)))
+    return df
+
+
+# Per-frame memo for values derived from a pipeline frame (OHLC arrays, swings).
+# Keyed on the frame's id and length; the stored weakref makes sure a hit is
+# the very same frame object and not a new one that reused a freed id.
+FRAME_MEMO_MAX = 2048
+_FRAME_MEMO = OrderedDict()
+_FRAME_MEMO_LOCK = threading.Lock()
+
+
+def frame_memo(df, tag, compute):
+    """
+    Return compute() for `df`, reusing the result from an earlier call with the
+    same frame object and `tag`. Oldest entries are evicted first.
+    """
+    key = (id(df), len(df), tag)
+    with _FRAME_MEMO_LOCK:
+        hit = _FRAME_MEMO.get(key)
+    if hit is not None and hit[0]() is df:
+        return hit[1]
+
+    value = compute()
+    with _FRAME_MEMO_LOCK:
+        _FRAME_MEMO[key] = (weakref.ref(df), value)
+        if len(_FRAME_MEMO) > FRAME_MEMO_MAX:
+            _FRAME_MEMO.popitem(last=False)
+    return value
+
+
+# Signals emitted within the same quarter second share one timestamp string
+NOW_ISO_TTL = 0.25
+_last_now_iso = (0.0, "")
+
+
+def batch_now_iso():
+    """Local-time ISO timestamp for signals, rebuilt at most every NOW_ISO_TTL seconds."""
+    global _last_now_iso
+    t = time.monotonic()
+    stamped_at, iso = _last_now_iso
+    if t - stamped_at > NOW_ISO_TTL or not iso:
+        iso = datetime.now().astimezone().isoformat()
+        _last_now_iso = (t, iso)
+    return iso
+
+
+def ohlc_soa(df):
+    """
+    open/high/low/close of a normalized frame as one read-only, C-contiguous
+    float32 (4, n) array: each field is a contiguous row, matching the float32
+    storage of pipeline frames. Built once per frame.
+    """
+    def build():
+        soa = np.ascontiguousarray(df[OHLC_COLS].to_numpy(dtype=np.float32).T)
+        soa.flags.writeable = False
+        return soa
+    return frame_memo(df, "ohlc_soa", build)
@@ -0,0 +1,16 @@
+# strategies/_warmup.py
+import numpy as np
+from strategies._nb_kernels import _last_two_emas, _macd_signal, atr_sma
+
+
+def warmup(n=32):
+    """
+    Run every strategy kernel once on dummy data, so a fresh process (the
+    pipeline or a pool worker) has them loaded before the first real ticker.
+    """
+    x = np.linspace(100.0, 101.0, n)
+    _macd_signal(x, x[::-1].copy(), x, x, x, x, x)
+    bars = x.astype(np.float32)
+    atr_sma(bars + 1, bars - 1, bars, 14, np.empty(n))
+    _last_two_emas(bars, 0.1, 0.2)
+    _last_two_emas(x, 0.1, 0.2)
@@ -1,51 +1,13 @@
 # src/strategies/closing_near_highlow.py
-import pandas as pd
-from datetime import datetime
 import numpy as np
+from strategies._utils import batch_now_iso, ensure_normalized, ohlc_soa
 
-# No external indicator requirement; we compute ATR fallback if needed.
+# No external indicator requirement; ensure_normalized fills in ATR if needed.
 REQUIRED_INDICATORS = []
 
 STRATEGY_TYPE = "daily"  # or "SWING" based on your strategy design
 
 
-def _safe_float(x):
-    """Convert scalar/1-element Series to float safely."""
-    try:
-        # If pandas Series or numpy scalar
-        if hasattr(x, "iloc"):
-            return float(x.iloc[0])
-        return float(x)
-    except Exception:
-        return None
-
-
-def _compute_atr(df, length=14):
-    """
-    Compute simple ATR from daily DataFrame.
-    Returns ATR as float (based on last `length` rows). If not possible, returns None.
-    """
-    if df is None or df.empty:
-        return None
-    d = df.rename(columns=str.lower).dropna(subset=["high", "low", "close"])
-    if d.shape[0] < 2:
-        return None
-
-    # True range per row (current high-low, current high - prev close, prev close - current low)
-    h = d["high"]
-    l = d["low"]
-    c = d["close"]
-    prev_c = c.shift(1)
-    tr1 = h - l
-    tr2 = (h - prev_c).abs()
-    tr3 = (l - prev_c).abs()
-    true_range = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-    atr = true_range.rolling(length, min_periods=1).mean().iloc[-1]
-    if pd.isna(atr):
-        return None
-    return float(atr)
-
-
 def generate_signal(ticker, multi_df, threshold=0.10, rr=2.0, min_confidence=0.6):
     """
     Live pipeline adapter.
@@ -59,22 +21,17 @@ def generate_signal(ticker, multi_df, threshold=0.10, rr=2.0, min_confidence=0.6
         return None
 
     # Work with lowercase column names, ensure OHLC exist
-    d = df.rename(columns=str.lower).dropna(subset=["open", "high", "low", "close"])
+    d = ensure_normalized(df)
     if d.shape[0] < 2:
         return None
 
-    # Use previous full day (signal) and current row to estimate next open
-    today = d.iloc[-2]   # the day used to form the signal
-    next_bar = d.iloc[-1]  # the most recent bar (next open placeholder)
-
-    close_price = _safe_float(today["close"])
-    high_price = _safe_float(today["high"])
-    low_price = _safe_float(today["low"])
-    next_open = _safe_float(next_bar["open"])
-
-    if None in (close_price, high_price, low_price, next_open):
-        return None
+    # Previous full day (signal), as plain floats from the frame's OHLC arrays
+    # instead of a Series per row
+    soa = ohlc_soa(d)
+    _, high_price, low_price, close_price = soa[:, -2].tolist()
 
+    # Most days are not near either extreme: decide that on the three floats
+    # before anything else is read or computed
     day_range = high_price - low_price
     if day_range <= 0:
         return None
@@ -86,14 +43,10 @@ def generate_signal(ticker, multi_df, threshold=0.10, rr=2.0, min_confidence=0.6
     if not (buy_cond or sell_cond):
         return None
 
-    # ATR for stoploss sizing (fallback to day_range if ATR not available)
-    atr = None
-    # Accept precomputed ATR column if present on daily rows
-    if "atr" in d.columns:
-        atr = _safe_float(today.get("atr", None))
-    if atr is None:
-        atr = _compute_atr(d, length=14)
-    if atr is None or atr == 0:
+    # ATR for stoploss sizing: the frame's atr column (the pipeline's, or the
+    # rolling one ensure_normalized adds), as of the signal day
+    atr = float(d["atr"].iat[-2])
+    if atr == 0:
         # fallback small percentage of price
         atr = max(day_range, max(1e-6, abs(close_price) * 0.01))
 
@@ -134,8 +87,40 @@ def generate_signal(ticker, multi_df, threshold=0.10, rr=2.0, min_confidence=0.6
         "ExitRule": exit_rule,
         "Confidence": round(float(confidence), 2),
         "Strategy": "closing_near_highlow_refined",
-        "Timestamp": datetime.now().astimezone().isoformat()
+        "Timestamp": batch_now_iso()
     }
 
     # Let pipeline decide a min confidence threshold; still return signal even if lower.
     return signal
+
+
+def generate_signals_batch(tickers, data, threshold=0.10, rr=2.0):
+    """
+    generate_signal for a whole watchlist: {ticker: signal or None} for every
+    ticker in `tickers`, `data` mapping ticker -> multi_df.
+    The near-high/low test runs once over all tickers' signal-day bars; only
+    the tickers that pass it go through generate_signal.
+    """
+    out = dict.fromkeys(tickers)
+    names, bars = [], []
+    for t in tickers:
+        df = data.get(t, {}).get("1d")
+        if df is None or len(df) < 2:
+            continue
+        d = ensure_normalized(df)
+        if d.shape[0] < 2:
+            continue
+        names.append(t)
+        bars.append(ohlc_soa(d)[1:, -2])  # high, low, close of the signal day
+    if not names:
+        return out
+
+    high, low, close = np.array(bars, dtype=float).T
+    day_range = high - low
+    near = (day_range > 0) & (
+        (close >= high - threshold * day_range) | (close <= low + threshold * day_range)
+    )
+    for i in np.flatnonzero(near):
+        t = names[i]
+        out[t] = generate_signal(t, data[t], threshold=threshold, rr=rr)
+    return out
@@ -1,11 +1,15 @@
 # strategies/macd_crossover.py
 
-import pandas as pd
-from datetime import datetime
+import numpy as np
+from strategies._utils import batch_now_iso
+from strategies._nb_kernels import SIDE_BUY, SIDE_NONE, _macd_signal
 
 # Tell pipeline that this strategy needs these precomputed indicators
 REQUIRED_INDICATORS = ["macd", "signal", "hist", "ema20", "ema50", "atr"]
 
+# Column order of the arrays passed to _macd_signal
+MACD_COLS = ["macd", "signal", "hist", "ema20", "ema50", "close", "atr"]
+
 def generate_signal(ticker, multi_df):
     """
     MACD crossover strategy with trend filter and volatility-based stoploss.
@@ -17,34 +21,12 @@ def generate_signal(ticker, multi_df):
     if df is None or len(df) < 50:
         return None
 
-    # Get last 2 candles for crossover
-    prev, curr = df.iloc[-2], df.iloc[-1]
-
-    # Detect MACD crossover
-    buy_cross = prev["macd"] < prev["signal"] and curr["macd"] > curr["signal"]
-    sell_cross = prev["macd"] > prev["signal"] and curr["macd"] < curr["signal"]
-
-    side = None
-    if buy_cross and curr["ema20"] > curr["ema50"]:
-        side = "BUY"
-    elif sell_cross and curr["ema20"] < curr["ema50"]:
-        side = "SELL"
-    else:
+    # Last 10 bars of every input as contiguous float rows, one kernel call
+    bars = df.iloc[-10:][MACD_COLS].to_numpy(dtype=float)
+    side_code, entry, stoploss, target, confidence = _macd_signal(*np.ascontiguousarray(bars.T))
+    if side_code == SIDE_NONE:
         return None
-
-    entry = float(curr["close"])
-    atr = float(curr["atr"])
-
-    if side == "BUY":
-        stoploss = entry - atr
-        target = entry + 2 * atr
-    else:
-        stoploss = entry + atr
-        target = entry - 2 * atr
-
-    # Dynamic confidence score (how strong the MACD momentum is)
-    hist_strength = abs(curr["hist"]) / (abs(df["hist"].iloc[-10:].mean()) + 1e-6)
-    confidence = min(1.0, max(0.6, hist_strength))
+    side = "BUY" if side_code == SIDE_BUY else "SELL"
 
     return {
         "Stock": ticker,
@@ -54,5 +36,5 @@ def generate_signal(ticker, multi_df):
         "Target": round(target, 2),
         "Confidence": round(confidence, 2),
         "Strategy": "macd_crossover",
-        "Timestamp": datetime.now().astimezone().isoformat(),
+        "Timestamp": batch_now_iso(),
     }
@@ -1,8 +1,9 @@
 # strategies/market_structure_orderblock.py
 import math
-import pandas as pd
-from datetime import datetime
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from typing import Optional, Dict, Any
+from strategies._utils import batch_now_iso, ensure_normalized, frame_memo, ohlc_soa, rolling_atr
 
 # tell pipeline what indicators you need (helps fetcher)
 REQUIRED_INDICATORS = ["atr"]
@@ -18,45 +19,26 @@ CONFIDENCE_BASE = 0.5
 MIN_MOVE_PCT_FOR_CONFIDENCE = 0.3  # 0.3% move gives some confidence boost
 
 
-def _rolling_atr(df: pd.DataFrame, period: int = 14) -> pd.Series:
-    """Simple ATR (returns last ATR series). Expects columns: high, low, close."""
-    high = df["high"]
-    low = df["low"]
-    close = df["close"]
-    tr1 = high - low
-    tr2 = (high - close.shift(1)).abs()
-    tr3 = (low - close.shift(1)).abs()
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-    atr = tr.rolling(period, min_periods=1).mean()
-    return atr
-
-
-def _find_zigzag_extrema(close: pd.Series, length: int = 9):
+def _find_zigzag_extrema(close: np.ndarray, length: int = 9):
     """
     Very simple zigzag: mark local maxima/minima where the close is the max/min
     over a centered window of size 2*length+1.
-    Returns two lists of indices: peaks, troughs
+    Returns two ascending int arrays of indices: peaks, troughs
     """
     n = len(close)
-    peaks = []
-    troughs = []
     if n < (length * 2 + 1):
-        return peaks, troughs
-
-    # convert to numpy for speed
-    arr = close.values
-    for i in range(length, n - length):
-        window = arr[i - length : i + length + 1]
-        center = arr[i]
-        if center == window.max():
-            peaks.append(i)
-        if center == window.min():
-            troughs.append(i)
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+    # one row per centered window; row k is centered on bar k + length
+    windows = sliding_window_view(close, length * 2 + 1)
+    centers = close[length : n - length]
+    peaks = np.flatnonzero(centers == windows.max(axis=1)) + length
+    troughs = np.flatnonzero(centers == windows.min(axis=1)) + length
     return peaks, troughs
 
 
 def generate_signal(ticker: str, multi_df: dict, zigzag_length: int = ZIGZAG_LENGTH,
-                    fib_factor: float = FIB_FACTOR) -> Optional[Dict[str, Any]]:
+                    fib_factor: float = FIB_FACTOR, verbose: bool = False) -> Optional[Dict[str, Any]]:
     """
     Expects multi_df["1h"] to be a DataFrame with columns: open, high, low, close, volume (case-insensitive)
     Returns None if no valid signal found, otherwise returns a dict:
@@ -71,49 +53,46 @@ def generate_signal(ticker: str, multi_df: dict, zigzag_length: int = ZIGZAG_LEN
       "StrategyType": "intraday",
       "Timestamp": "..."
     }
+    With verbose=True the swing/threshold details are added under "Notes".
     """
 
     df = multi_df.get("1h")
     if df is None or df.empty or len(df) < MIN_BARS:
         return None
 
+    src = df  # pipeline frame; derived values are memoized against it
     # normalize column names to lower-case
-    df = df.rename(columns=str.lower).dropna(subset=["open", "high", "low", "close"])
+    df = ensure_normalized(df)
     if df.shape[0] < MIN_BARS:
         return None
 
-    close = df["close"]
-    high = df["high"]
-    low = df["low"]
+    # close row of the frame's cached OHLC array: shared by the zigzag scan and
+    # the scalar reads below (no per-access Series boxing)
+    c = ohlc_soa(df)[3]
 
     # find zigzag extrema (peaks/troughs)
-    peaks, troughs = _find_zigzag_extrema(close, length=zigzag_length)
-    if not peaks and not troughs:
+    peaks, troughs = frame_memo(
+        src, ("zigzag", zigzag_length),
+        lambda: _find_zigzag_extrema(c, length=zigzag_length),
+    )
+    if peaks.size == 0 and troughs.size == 0:
         return None
 
     # choose last significant swing high and low (exclude last bar index)
     last_index = len(df) - 1
 
-    # find last peak index strictly before last bar
-    last_peak_idx = None
-    for idx in reversed(peaks):
-        if idx < last_index:
-            last_peak_idx = idx
-            break
-
-    # find last trough index strictly before last bar
-    last_trough_idx = None
-    for idx in reversed(troughs):
-        if idx < last_index:
-            last_trough_idx = idx
-            break
+    # last peak / trough strictly before the last bar (both arrays are ascending)
+    i = np.searchsorted(peaks, last_index)
+    last_peak_idx = int(peaks[i - 1]) if i > 0 else None
+    j = np.searchsorted(troughs, last_index)
+    last_trough_idx = int(troughs[j - 1]) if j > 0 else None
 
     # Need both a recent peak and trough to compute a zone range
     if last_peak_idx is None or last_trough_idx is None:
         return None
 
-    peak_price = float(close.iloc[last_peak_idx])
-    trough_price = float(close.iloc[last_trough_idx])
+    peak_price = float(c[last_peak_idx])
+    trough_price = float(c[last_trough_idx])
 
     # define range between last peak and trough
     zone_range = abs(peak_price - trough_price)
@@ -123,20 +102,20 @@ def generate_signal(ticker: str, multi_df: dict, zigzag_length: int = ZIGZAG_LEN
     # define green and red zones (we treat the last trough as bullish/order-block zone,
     # and the last peak as bearish/order-block zone).
     # We'll treat breakout when price moves past the zone by fib_factor * range.
-    last_close = float(close.iloc[-1])
-    last_open = float(df["open"].iloc[-1])
+    last_close = float(c[-1])
 
     # breakout thresholds
     buy_threshold = trough_price + fib_factor * zone_range
     sell_threshold = peak_price - fib_factor * zone_range
 
     # compute a risk proxy (small move percent)
-    prev_close = float(close.iloc[-2])
+    prev_close = float(c[-2])
     move_pct = (last_close - prev_close) / (prev_close + 1e-9) * 100.0
 
-    # ATR for sizing / confidence
+    # ATR for sizing / confidence: this strategy's simple 14-bar average of true
+    # range (not the pipeline's Wilder atr column), computed once per frame
     try:
-        atr = float(_rolling_atr(df, period=14).iloc[-1])
+        atr = float(frame_memo(src, "rolling_atr", lambda: rolling_atr(df))[-1])
     except Exception:
         atr = zone_range * 0.01 if zone_range > 0 else 1.0
 
@@ -187,8 +166,10 @@ def generate_signal(ticker: str, multi_df: dict, zigzag_length: int = ZIGZAG_LEN
         "Confidence": round(conf, 2),
         "Strategy": "market_structure_orderblock",
         "StrategyType": "intraday",
-        "Timestamp": datetime.now().astimezone().isoformat(),
-        "Notes": {
+        "Timestamp": batch_now_iso(),
+    }
+    if verbose:
+        signal["Notes"] = {
             "last_peak_idx": int(last_peak_idx),
             "last_trough_idx": int(last_trough_idx),
             "peak_price": round(peak_price, 4),
@@ -199,7 +180,6 @@ def generate_signal(ticker: str, multi_df: dict, zigzag_length: int = ZIGZAG_LEN
             "atr": round(atr, 6),
             "last_close": round(last_close, 4),
             "move_pct": round(move_pct, 4),
-        },
-    }
+        }
 
     return signal
@@ -1,6 +1,8 @@
+import numpy as np
 import pandas as pd
-from datetime import datetime, time
+from datetime import datetime
 import pytz
+from strategies._nb_kernels import _last_two_emas
 
 # Tag so pipeline can detect behavior
 STRATEGY_TYPE = "intraday"
@@ -8,7 +10,77 @@ STRATEGY_TYPE = "intraday"
 # No external indicator dependencies
 REQUIRED_INDICATORS = []
 
-def generate_signal(ticker, multi_df, threshold_vol=1.2, rr=2.0):
+IST = pytz.timezone("Asia/Kolkata")
+OHLCV = ["open", "high", "low", "close", "volume"]
+
+
+# Session times as nanoseconds since IST midnight (IST is UTC+5:30 all year)
+IST_OFFSET_NS = (5 * 60 + 30) * 60 * 10**9
+DAY_NS = 24 * 60 * 60 * 10**9
+OR_START_NS = (9 * 60 + 15) * 60 * 10**9
+OR_END_NS = (9 * 60 + 30) * 60 * 10**9
+
+
+def _ist_time_of_day(idx):
+    """IST time of day of each bar in ns; naive timestamps are taken as UTC."""
+    return (idx.as_unit("ns").asi8 + IST_OFFSET_NS) % DAY_NS
+
+
+def _trend_emas(close):
+    """Last EMA20/EMA50 of a close array, in the layout the typed EMA kernel takes."""
+    if close.dtype != np.float32:
+        close = close.astype(np.float64, copy=False)
+    return _last_two_emas(np.ascontiguousarray(close), 2.0 / 21.0, 2.0 / 51.0)
+
+
+def _tail_atr(high, low, close, length=14):
+    """ATR: mean true range of the last `length` bars (needs length + 1 bars for a full window)."""
+    k = min(len(close) - 1, length)
+    h, l, pc = high[-k:], low[-k:], close[-k - 1:-1]
+    tr = np.maximum(h - l, np.maximum(np.abs(h - pc), np.abs(l - pc)))
+    return float(tr.mean())
+
+
+def _orb_levels(side, entry, or_high, or_low, vol, avg_vol_or, ema20, ema50, atr, rr):
+    """
+    Risk, stop, target and confidence for breakout entries, side being +1 (BUY)
+    or -1 (SELL). Works on scalars or on equal-length arrays (one element per
+    ticker), so generate_signal and the batch screen share the arithmetic.
+    """
+    # risk sizing: the OR boundary, widened to at least half an ATR
+    boundary = np.where(side > 0, entry - or_low, or_high - entry)
+    risk = np.maximum(boundary, 0.5 * atr)
+    stoploss = entry - side * risk
+    target = entry + side * rr * risk
+
+    # Confidence score: combine trend strength + volume ratio
+    # volume ratio = vol / average volume of OR period; with no OR volume any
+    # bar volume hits the cap and a zero-volume bar scores 0
+    vol_ratio = np.divide(
+        vol, avg_vol_or, out=np.where(np.asarray(vol) > 0, 2.0, 0.0), where=avg_vol_or > 0
+    )
+    # Trend strength factor = abs(ema20 - ema50) / ema50
+    trend_strength = np.divide(np.abs(ema20 - ema50), ema50, out=np.zeros(np.shape(ema50)), where=ema50 != 0)
+    # Confidence formula (tune coefficients), capped between 0 and 1
+    confidence = np.clip(0.5 + 0.3 * np.minimum(vol_ratio, 2.0) + 0.2 * np.minimum(trend_strength * 100, 1.0), 0.0, 1.0)
+    return risk, stoploss, target, confidence
+
+
+def _signal(ticker, side, entry, stoploss, target, confidence, now_iso):
+    """Signal dict from already rounded levels."""
+    return {
+        "Stock": ticker,
+        "Side": "BUY" if side > 0 else "SELL",
+        "Entry": entry,
+        "StopLoss": stoploss,
+        "Target": target,
+        "Confidence": confidence,
+        "Strategy": "orb_trend_filter",
+        "Timestamp": now_iso
+    }
+
+
+def generate_signal(ticker, multi_df, threshold_vol=1.2, rr=2.0, now_iso=None):
     """
     ORB + Trend Filter strategy.
     - Use 5m timeframe data in multi_df["5m"]
@@ -17,105 +89,137 @@ def generate_signal(ticker, multi_df, threshold_vol=1.2, rr=2.0):
     - Apply trend filter via 20 EMA vs 50 EMA
     - One signal per stock per day (handled by pipeline dedupe)
     Returns dict with keys: Stock, Side, Entry, StopLoss, Target, Confidence, Strategy, Timestamp
+    Timestamp is `now_iso` when given (one clock read per scan), else the current IST time.
     """
 
     df = multi_df.get("5m")
     if df is None or df.empty:
         return None
 
-    # Convert to a working copy
-    d = df.copy().rename(columns=str.lower)
-    # Drop missing
-    d = d.dropna(subset=["open", "high", "low", "close", "volume"])
+    # Lower-case view without a defensive copy; rename/dropna already return
+    # new frames, and only plain arrays are used past this point
+    d = df.rename(columns=str.lower).dropna(subset=OHLCV)
     n = len(d)
     if n < 10:
         return None
+    high = d["high"].to_numpy()
+    low = d["low"].to_numpy()
+    close_arr = d["close"].to_numpy()
+    volume = d["volume"].to_numpy()
 
-    # Timezone assumption: multi_df timestamps are in IST or local matching your pipeline
-    # Identify the opening range period: between 9:15 and 9:30 AM
-    ist = pytz.timezone("Asia/Kolkata")
-    def is_in_or_period(ts):
-        t = ts.astimezone(ist).time()
-        return time(9, 15) <= t < time(9, 30)
+    # Timezone assumption: session times are matched in IST
+    tod = _ist_time_of_day(d.index)
 
-    or_rows = d[d.index.map(is_in_or_period)]
-    if or_rows.empty:
+    # Identify the opening range period: between 9:15 and 9:30 AM
+    or_pos = np.flatnonzero((tod >= OR_START_NS) & (tod < OR_END_NS))
+    if len(or_pos) == 0:
         return None
 
     # Determine OR high/low
-    or_high = float(or_rows["high"].max())
-    or_low = float(or_rows["low"].min())
+    or_high = float(high[or_pos].max())
+    or_low = float(low[or_pos].min())
 
-    # After 9:30, check next bars
-    # Use data after OR period
-    post_or = d[d.index.map(lambda ts: ts.astimezone(ist).time() >= time(9, 30))]
-    if post_or.empty:
+    # After 9:30, check next bars (09:30 up to midnight)
+    post_pos = np.flatnonzero(tod >= OR_END_NS)
+    if len(post_pos) == 0:
         return None
 
     # Use the most recent bar for breakout test
-    last = post_or.iloc[-1]
-    close = float(last["close"])
-    high = float(last["high"])
-    low = float(last["low"])
-    vol = float(last["volume"])
-
-    # Trend filter: compute EMAs on full df
-    d["ema20"] = d["close"].ewm(span=20, adjust=False).mean()
-    d["ema50"] = d["close"].ewm(span=50, adjust=False).mean()
-
-    last_ema20 = float(d["ema20"].iloc[-1])
-    last_ema50 = float(d["ema50"].iloc[-1])
+    last = post_pos[-1]
+    close = float(close_arr[last])
+    vol = float(volume[last])
 
-    # Determine breakout
+    # Determine breakout; most bars stay inside the range, so bail out
+    # before any O(N) EMA work
     long_break = close > or_high
     short_break = close < or_low
+    if not (long_break or short_break):
+        return None
 
-    # Enforce trend filter
+    # Trend filter: last EMA20/EMA50 of the full close series (one compiled pass)
+    last_ema20, last_ema50 = _trend_emas(close_arr)
     if long_break and not (last_ema20 > last_ema50):
         return None
     if short_break and not (last_ema20 < last_ema50):
         return None
-
-    side = "BUY" if long_break else ("SELL" if short_break else None)
-    if side is None:
-        return None
+    side = 1 if long_break else -1
 
     entry = close  # entry at close of breakout bar
-    # risk sizing: difference to the OR boundary
-    if side == "BUY":
-        risk = entry - or_low
-        stoploss = or_low
-        target = entry + rr * risk
-    else:
-        risk = or_high - entry
-        stoploss = or_high
-        target = entry - rr * risk
-
+    avg_vol_or = volume[or_pos].mean()
+    risk, stoploss, target, confidence = _orb_levels(
+        side, entry, or_high, or_low, vol, avg_vol_or,
+        last_ema20, last_ema50, _tail_atr(high, low, close_arr), rr
+    )
     if risk <= 0:
         return None
 
-    # Confidence score: combine trend strength + volume ratio
-    # volume ratio = vol / average volume of OR period
-    avg_vol_or = or_rows["volume"].mean() if len(or_rows) > 0 else 1
-    vol_ratio = vol / (avg_vol_or + 1e-9)
-
-    # Trend strength factor = abs(ema20 - ema50) / ema50
-    trend_strength = abs(last_ema20 - last_ema50) / (last_ema50 + 1e-9)
-
-    # Confidence formula (tune coefficients)
-    confidence = 0.5 + 0.3 * min(vol_ratio, 2.0) + 0.2 * min(trend_strength * 100, 1.0)
-    # Cap between 0 and 1
-    confidence = max(0.0, min(1.0, confidence))
+    levels = np.round([entry, stoploss, target, confidence], 2).tolist()
+    return _signal(ticker, side, *levels, now_iso or datetime.now(IST).isoformat())
 
-    signal = {
-        "Stock": ticker,
-        "Side": side,
-        "Entry": round(entry, 2),
-        "StopLoss": round(stoploss, 2),
-        "Target": round(target, 2),
-        "Confidence": round(confidence, 2),
-        "Strategy": "orb_trend_filter",
-        "Timestamp": datetime.now(ist).isoformat()
-    }
 
-    return signal
+def generate_signals_batch(tickers, data, threshold_vol=1.2, rr=2.0, now_iso=None):
+    """
+    generate_signal for a whole watchlist: {ticker: signal or None}, `data`
+    mapping ticker -> multi_df. Every ticker's 5m bars are stacked into one
+    (ticker, ts) frame so the opening ranges and last post-OR bars come from
+    one groupby each; breakout and trend masks, stops, targets and confidence
+    are then array operations over all tickers at once.
+    """
+    out = dict.fromkeys(tickers)
+    frames = {}
+    for t in tickers:
+        df = data.get(t, {}).get("5m")
+        if df is None or df.empty:
+            continue
+        d = df.rename(columns=str.lower).dropna(subset=OHLCV)
+        if len(d) < 10:
+            continue
+        frames[t] = pd.DataFrame({
+            "high": d["high"].to_numpy(), "low": d["low"].to_numpy(),
+            "close": d["close"].to_numpy(), "volume": d["volume"].to_numpy(),
+            "tod": _ist_time_of_day(d.index),
+        })
+    if not frames:
+        return out
+
+    panel = pd.concat(frames, names=["ticker", "bar"])
+    tod = panel["tod"].to_numpy()
+    or_rows = panel[(tod >= OR_START_NS) & (tod < OR_END_NS)]
+    post_or = panel[tod >= OR_END_NS]
+
+    screen = or_rows.groupby(level="ticker").agg(
+        or_high=("high", "max"), or_low=("low", "min"), or_vol=("volume", "mean")
+    )
+    screen = screen.join(post_or.groupby(level="ticker")[["close", "volume"]].last(), how="inner")
+    close = screen["close"].to_numpy(np.float64)
+    or_high = screen["or_high"].to_numpy(np.float64)
+    or_low = screen["or_low"].to_numpy(np.float64)
+    long_break = close > or_high
+    short_break = close < or_low
+    breakout = long_break | short_break
+    if not breakout.any():
+        return out
+    screen, close, or_high, or_low = screen[breakout], close[breakout], or_high[breakout], or_low[breakout]
+    long_break = long_break[breakout]
+
+    # Last EMA20/EMA50 and ATR per breakout candidate, then the trend filter as one mask
+    cands = [frames[t] for t in screen.index]
+    emas = np.array([_trend_emas(f["close"].to_numpy()) for f in cands])
+    atr = np.array([
+        _tail_atr(f["high"].to_numpy(), f["low"].to_numpy(), f["close"].to_numpy()) for f in cands
+    ])
+    ema20, ema50 = emas[:, 0], emas[:, 1]
+    side = np.where(long_break, 1, -1)
+    side[np.where(long_break, ema20 <= ema50, ema20 >= ema50)] = 0
+
+    risk, stoploss, target, confidence = _orb_levels(
+        side, close, or_high, or_low, screen["volume"].to_numpy(np.float64),
+        screen["or_vol"].to_numpy(np.float64), ema20, ema50, atr, rr
+    )
+    side[risk <= 0] = 0
+    levels = np.round(np.column_stack([close, stoploss, target, confidence]), 2).tolist()
+    now_iso = now_iso or datetime.now(IST).isoformat()
+    for t, sd, lv in zip(screen.index, side.tolist(), levels):
+        if sd:
+            out[t] = _signal(t, sd, *lv, now_iso)
+    return out
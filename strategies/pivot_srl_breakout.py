@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import pytz
@@ -5,11 +6,22 @@ import pytz
 STRATEGY_TYPE = "intraday"
 REQUIRED_INDICATORS = []  # uses vanilla price data only
 
+IST = pytz.timezone("Asia/Kolkata")
+OHLC = ["open", "high", "low", "close"]
+
+# Pivot levels per (ticker, daily bar date). Only completed daily bars are
+# cached: the bar for the current session keeps moving until the close.
+PIVOT_CACHE_MAX = 5000
+_PIVOT_CACHE = {}
+
 def compute_pivots(prev_day_df):
     """Compute standard pivot, resistance, support levels from previous day."""
     h = float(prev_day_df["high"].iloc[-1])
     l = float(prev_day_df["low"].iloc[-1])
     c = float(prev_day_df["close"].iloc[-1])
+    return _pivot_levels(h, l, c)
+
+def _pivot_levels(h, l, c):
     pivot = (h + l + c) / 3.0
     r1 = 2 * pivot - l
     s1 = 2 * pivot - h
@@ -18,12 +30,45 @@ def compute_pivots(prev_day_df):
     # you can compute more levels if desired
     return pivot, r1, s1, r2, s2
 
-def generate_signal(ticker, multi_df, rr=2.0):
+def _cached_pivots(ticker, day, h, l, c):
+    """Pivot levels for the daily bar (day, h, l, c), reused for the same ticker and day."""
+    key = (ticker, day)
+    levels = _PIVOT_CACHE.get(key)
+    if levels is None:
+        levels = _pivot_levels(h, l, c)
+        if day < datetime.now(IST).date():
+            if len(_PIVOT_CACHE) >= PIVOT_CACHE_MAX:
+                _PIVOT_CACHE.clear()
+            _PIVOT_CACHE[key] = levels
+    return levels
+
+def _last_daily(df1):
+    """(date, high, low, close) of the last complete daily bar; None with fewer than two complete bars."""
+    hlc = df1[["high", "low", "close"]].to_numpy(dtype=float)
+    complete = np.flatnonzero(~np.isnan(hlc).any(axis=1))
+    if len(complete) < 2:
+        return None
+    i = complete[-1]
+    h, l, c = hlc[i].tolist()
+    return df1.index[i].date(), h, l, c
+
+def _last_close(df5):
+    """Close of the last intraday bar with a full OHLC row (None if there is none)."""
+    pos = {col.lower(): i for i, col in enumerate(df5.columns)}
+    row = np.array([df5.iat[-1, pos[col]] for col in OHLC], dtype=float)
+    if not np.isnan(row).any():
+        return float(row[3])
+    # Incomplete last bar: fall back to the last complete one
+    d5 = df5.rename(columns=str.lower).dropna(subset=OHLC)
+    return float(d5["close"].iat[-1]) if len(d5) else None
+
+def generate_signal(ticker, multi_df, rr=2.0, now_iso=None):
     """
     Pivot / SR breakout strategy:
     - Uses daily bars for previous day to compute pivot, R/S
     - Uses intraday (e.g., 5m) bars to catch breakout above resistance or below support
     - Entry when price crosses pivot + confirmation
+    - Timestamp is `now_iso` when given (one clock read per scan), else the current IST time
     """
     # Need daily for pivots
     df1 = multi_df.get("1d")
@@ -31,19 +76,17 @@ def generate_signal(ticker, multi_df, rr=2.0):
     if df1 is None or df1.empty or df5 is None or df5.empty:
         return None
 
-    # dropna
-    df1 = df1.dropna(subset=["high", "low", "close"])
-    if df1.shape[0] < 2:
+    # Last complete daily bar (need at least two) and last intraday close,
+    # read as scalars without copying either frame
+    daily = _last_daily(df1)
+    if daily is None:
         return None
-
-    # Get previous day's data (last full day)
-    prev = df1.iloc[-2:]  # get last 2 days or more
-    pivot, r1, s1, r2, s2 = compute_pivots(prev)
+    pivot, r1, s1, r2, s2 = _cached_pivots(ticker, *daily)
 
     # In intraday 5-min df, monitor breakouts
-    d5 = df5.copy().rename(columns=str.lower).dropna(subset=["open", "high", "low", "close"])
-    last = d5.iloc[-1]
-    c = float(last["close"])
+    c = _last_close(df5)
+    if c is None:
+        return None
 
     # Breakout conditions
     long_break = c > pivot and c > r1
@@ -76,7 +119,6 @@ def generate_signal(ticker, multi_df, rr=2.0):
     confidence = 0.5 + 0.5 * min(dist_from_pivot / (abs(sr_range) + 1e-9), 1.0)
     confidence = max(0.0, min(1.0, confidence))
 
-    ist = pytz.timezone("Asia/Kolkata")
     return {
         "Stock": ticker,
         "Side": side,
@@ -85,5 +127,40 @@ def generate_signal(ticker, multi_df, rr=2.0):
         "Target": round(target, 2),
         "Confidence": round(confidence, 2),
         "Strategy": "pivot_srl_breakout",
-        "Timestamp": datetime.now(ist).isoformat(),
+        "Timestamp": now_iso or datetime.now(IST).isoformat(),
     }
+
+
+def generate_signals_batch(tickers, data, rr=2.0, now_iso=None):
+    """
+    generate_signal for a whole watchlist: {ticker: signal or None}, `data`
+    mapping ticker -> multi_df. Pivots and breakout tests for every ticker are
+    computed on stacked arrays in one pass; only tickers past R1/S1 go through
+    generate_signal.
+    """
+    out = dict.fromkeys(tickers)
+    names, rows = [], []
+    for t in tickers:
+        mdf = data.get(t, {})
+        df1, df5 = mdf.get("1d"), mdf.get("5m")
+        if df1 is None or df1.empty or df5 is None or df5.empty:
+            continue
+        daily = _last_daily(df1)
+        last = _last_close(df5)
+        if daily is None or last is None:
+            continue
+        names.append(t)
+        rows.append((*daily[1:], last))
+    if not names:
+        return out
+
+    h, l, c, last = np.array(rows, dtype=float).T
+    pivot = (h + l + c) / 3.0
+    r1 = 2 * pivot - l
+    s1 = 2 * pivot - h
+    breakout = ((last > pivot) & (last > r1)) | ((last < pivot) & (last < s1))
+    now_iso = now_iso or datetime.now(IST).isoformat()
+    for i in np.flatnonzero(breakout):
+        t = names[i]
+        out[t] = generate_signal(t, data[t], rr=rr, now_iso=now_iso)
+    return out
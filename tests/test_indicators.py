@@ -0,0 +1,51 @@
+# tests/test_indicators.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.fetch_live_data import EMA_SPANS, _batch_ema, add_indicators
+
+
+def ohlcv(n, seed=0, start="2024-01-01 09:15", freq="5min"):
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.normal(0, 1, n).cumsum()
+    return pd.DataFrame({
+        "open": close + rng.normal(0, 0.2, n),
+        "high": close + rng.random(n),
+        "low": close - rng.random(n),
+        "close": close,
+        "volume": rng.integers(1_000, 10_000, n).astype(float),
+    }, index=pd.date_range(start, periods=n, freq=freq, tz="Asia/Kolkata"))
+
+
+INDICATORS = [f"ema{s}" for s in EMA_SPANS] + ["macd", "signal", "hist", "rsi", "atr"]
+
+
+def test_ema_matches_pandas():
+    raw = ohlcv(300)
+    df = add_indicators(raw.copy())
+    close = raw["close"].astype(np.float32).astype(float)
+    for span in EMA_SPANS:
+        ref = close.ewm(span=span, adjust=False).mean().loc[df.index]
+        np.testing.assert_allclose(df[f"ema{span}"], ref, rtol=1e-5)
+
+
+@pytest.mark.parametrize("cut", [20, 150, 299])
+def test_incremental_matches_full(cut):
+    # A cached frame extended with new bars resumes every recurrence and must
+    # land on the same values as computing the whole history at once
+    raw = ohlcv(300, seed=cut)
+    full = add_indicators(raw.copy())
+    cached = add_indicators(raw.iloc[:cut].copy())
+    extended = add_indicators(pd.concat([cached, raw.iloc[cut:]]))
+
+    assert extended.index.equals(full.index)
+    np.testing.assert_allclose(extended[INDICATORS], full[INDICATORS], rtol=1e-6)
+
+
+def test_batch_ema_matches_pandas_for_ragged_series():
+    frames = {f"T{i}": ohlcv(n, seed=i) for i, n in enumerate([250, 120, 40])}
+    emas = _batch_ema(frames, 200)
+    for t, df in frames.items():
+        ref = df["close"].ewm(span=200, adjust=False).mean().to_numpy()
+        np.testing.assert_allclose(emas[t], ref, rtol=1e-9)
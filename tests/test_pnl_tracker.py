@@ -0,0 +1,64 @@
+# tests/test_pnl_tracker.py
+import numpy as np
+import pandas as pd
+
+from src import pnl_tracker
+from src.pnl_tracker import _changed_ranges, classify_trades
+
+
+def compute_reference(lp, entry, target, stop, side):
+    """The original per-row PnL classification classify_trades replaced."""
+    if pd.isna(lp) or lp == 0:
+        return "Open", 0.0
+    if side == "BUY":
+        if lp >= target:
+            return "Target Hit", ((target - entry) / entry) * 100
+        elif lp <= stop:
+            return "SL Hit", ((stop - entry) / entry) * 100
+        return "Open", ((lp - entry) / entry) * 100
+    elif side == "SELL":
+        if lp <= target:
+            return "Target Hit", ((entry - target) / entry) * 100
+        elif lp >= stop:
+            return "SL Hit", ((entry - stop) / entry) * 100
+        return "Open", ((entry - lp) / entry) * 100
+    return "Open", 0.0
+
+
+def test_classify_trades_matches_reference():
+    rng = np.random.default_rng(3)
+    n = 2000
+    entry = np.round(100 + rng.normal(0, 10, n), 2)
+    side = rng.choice(["BUY", "SELL", "HOLD"], n)
+    sign = np.where(side == "SELL", -1, 1)
+    target = np.round(entry * (1 + sign * 0.02), 2)
+    stop = np.round(entry * (1 - sign * 0.01), 2)
+    lp = np.round(entry * (1 + rng.normal(0, 0.02, n)), 2)
+    lp[::11] = np.nan
+    lp[::13] = 0.0
+    lp[::7] = target[::7]  # exactly on the level
+    lp[::9] = stop[::9]
+
+    result, pnl = classify_trades(lp, entry, target, stop, side)
+    ref = [compute_reference(*row) for row in zip(lp, entry, target, stop, side)]
+    assert list(result) == [r for r, _ in ref]
+    np.testing.assert_array_equal(pnl, np.round([p for _, p in ref], 2))
+
+
+def test_changed_ranges_without_previous_rewrites_all():
+    rows = [["1", "Open", "0.5"], ["2", "SL Hit", "-1"]]
+    assert _changed_ranges(rows, None) == [
+        {"range": f"{pnl_tracker.SHEET_NAME}!J2:L3", "values": rows}
+    ]
+
+
+def test_changed_ranges_merges_consecutive_changes():
+    old = [[str(i), "Open", "0"] for i in range(6)]
+    new = [r[:] for r in old]
+    for i in (1, 2, 5):
+        new[i][2] = "1.5"
+    assert _changed_ranges(new, old) == [
+        {"range": f"{pnl_tracker.SHEET_NAME}!J3:L4", "values": new[1:3]},
+        {"range": f"{pnl_tracker.SHEET_NAME}!J7:L7", "values": new[5:6]},
+    ]
+    assert _changed_ranges(old, [r[:] for r in old]) == []